@@ -16,6 +16,15 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
+# Start the background scan worker and monitoring scheduler
+python manage.py run_scan_worker &
+WORKER_PID=$!
+python manage.py run_monitor &
+MONITOR_PID=$!
+
 python manage.py runserver
 
+# Cleanup: stop the background processes when Django stops
+kill $WORKER_PID $MONITOR_PID
+
 
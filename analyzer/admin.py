@@ -1,13 +1,67 @@
 from django.contrib import admin
-from .models import ScanResult, Issue
+from .models import (
+    ArchivedScan, DailyDomainStats, DailyIssueStats, DailyScoreBucket, HeaderSet, MonitoredTarget, MonthlyIssueStats,
+    RescoreRun, RetentionPolicy, ScanBatch, ScanResult, Issue, SiteCrawl,
+)
+
+
+@admin.register(ScanBatch)
+class ScanBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'owner', 'status', 'total', 'completed', 'failed', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['created_at', 'finished_at']
+
+
+@admin.register(SiteCrawl)
+class SiteCrawlAdmin(admin.ModelAdmin):
+    list_display = ['url', 'owner', 'status', 'score', 'pages_scanned', 'pages_failed', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['url']
+    readonly_fields = ['created_at', 'finished_at', 'issues', 'errors']
+
+
+@admin.register(RescoreRun)
+class RescoreRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'requested_by', 'status', 'dry_run', 'total', 'processed', 'changed', 'created_at']
+    list_filter = ['status', 'dry_run', 'created_at']
+    readonly_fields = ['created_at', 'finished_at']
+
+
+@admin.register(HeaderSet)
+class HeaderSetAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'created_at']
+    search_fields = ['digest']
+    readonly_fields = ['digest', 'headers', 'created_at']
+
+
+@admin.register(MonitoredTarget)
+class MonitoredTargetAdmin(admin.ModelAdmin):
+    list_display = ['url', 'interval', 'next_scan_at', 'is_active', 'owner']
+    list_filter = ['is_active']
+    search_fields = ['url']
+    readonly_fields = ['created_at', 'last_scan']
 
 
 @admin.register(ScanResult)
 class ScanResultAdmin(admin.ModelAdmin):
-    list_display = ['url', 'score', 'created_at', 'owner']
-    list_filter = ['created_at', 'owner']
+    list_display = ['url', 'score', 'status', 'high_count', 'medium_count', 'low_count', 'created_at', 'owner']
+    list_filter = ['status', 'failure_reason', 'created_at', 'owner']
     search_fields = ['url']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'timings', 'tls', 'cookies']
+
+
+@admin.register(RetentionPolicy)
+class RetentionPolicyAdmin(admin.ModelAdmin):
+    list_display = ['owner', 'max_age', 'max_scans']
+    search_fields = ['owner__username']
+
+
+@admin.register(ArchivedScan)
+class ArchivedScanAdmin(admin.ModelAdmin):
+    list_display = ['scan_id', 'url', 'score', 'status', 'created_at', 'archived_at', 'owner']
+    list_filter = ['status', 'archived_at']
+    search_fields = ['url']
+    readonly_fields = ['scan_id', 'created_at', 'archived_at', 'path', 'offset', 'length']
 
 
 @admin.register(Issue)
@@ -15,5 +69,31 @@ class IssueAdmin(admin.ModelAdmin):
     list_display = ['scan_result', 'severity', 'category', 'created_at']
     list_filter = ['severity', 'category', 'created_at']
     search_fields = ['message', 'scan_result__url']
+    ordering = ['-created_at']
+
+
+@admin.register(DailyScoreBucket)
+class DailyScoreBucketAdmin(admin.ModelAdmin):
+    list_display = ['day', 'bucket', 'scans', 'score_total']
+    list_filter = ['day']
+
+
+@admin.register(DailyDomainStats)
+class DailyDomainStatsAdmin(admin.ModelAdmin):
+    list_display = ['domain', 'day', 'scans', 'score_total', 'high_count', 'medium_count', 'low_count']
+    list_filter = ['day']
+    search_fields = ['domain']
+
+
+@admin.register(DailyIssueStats)
+class DailyIssueStatsAdmin(admin.ModelAdmin):
+    list_display = ['day', 'severity', 'category', 'message', 'count']
+    list_filter = ['day', 'severity', 'category']
+    search_fields = ['message']
 
 
+@admin.register(MonthlyIssueStats)
+class MonthlyIssueStatsAdmin(admin.ModelAdmin):
+    list_display = ['month', 'severity', 'category', 'message', 'count']
+    list_filter = ['month', 'severity', 'category']
+    search_fields = ['message']
@@ -5,4 +5,33 @@ class AnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analyzer'
 
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from . import transport
+        from .db import configure_connection
+        from .rules import load_ruleset
+        from .scanner import RedirectTargetCache, SecurityScanner
+        from .tls import tls_cache
 
+        transport.configure(
+            pool_connections=getattr(settings, 'SCANNER_POOL_CONNECTIONS', transport.DEFAULT_POOL_CONNECTIONS),
+            pool_maxsize=getattr(settings, 'SCANNER_POOL_MAXSIZE', transport.DEFAULT_POOL_MAXSIZE),
+            dns_ttl=getattr(settings, 'SCANNER_DNS_TTL', transport.DEFAULT_DNS_TTL),
+        )
+        SecurityScanner.fetch_mode = getattr(settings, 'SCANNER_FETCH_MODE', SecurityScanner.fetch_mode)
+        SecurityScanner.max_body_bytes = getattr(settings, 'SCANNER_MAX_BODY_BYTES', SecurityScanner.max_body_bytes)
+        SecurityScanner.max_redirects = getattr(settings, 'SCANNER_MAX_REDIRECTS', SecurityScanner.max_redirects)
+
+        redirect_cache_ttl = getattr(settings, 'SCANNER_REDIRECT_CACHE_TTL', 300)
+        SecurityScanner.redirect_cache = RedirectTargetCache(
+            ttl=redirect_cache_ttl,
+            max_entries=getattr(settings, 'SCANNER_REDIRECT_CACHE_MAX_ENTRIES', 1024),
+        ) if redirect_cache_ttl else None
+        tls_cache.max_entries = getattr(settings, 'SCANNER_TLS_CACHE_MAX_ENTRIES', tls_cache.max_entries)
+
+        connection_created.connect(configure_connection, dispatch_uid='analyzer.db.configure_connection')
+
+        rules_path = getattr(settings, 'SCANNER_HEADER_RULES', None)
+        if rules_path:
+            SecurityScanner.header_rules = load_ruleset(rules_path)
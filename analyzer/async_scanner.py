@@ -0,0 +1,255 @@
+"""
+Async Security Scanner
+Runs the SecurityScanner checks on top of a non-blocking HTTP client so that
+hundreds of fetches can be in flight on a single event loop
+"""
+import asyncio
+import socket
+import ssl
+import time
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from . import metrics
+from .cookies import parse_set_cookies
+from .tls import tls_cache, tls_for_url
+from .scanner import (
+    FETCH_HEAD, HEAD_FALLBACK_STATUSES, USER_AGENT, Hop, ScanError, SecurityScanner,
+    certificate_verify_error, iter_causes, record_failure, record_timings, unverified_tls,
+)
+
+
+def fold_headers(raw_headers):
+    """
+    Build a header dict from raw (name, value) byte pairs, keeping the
+    server's capitalization and joining repeated headers like requests does
+    """
+    headers = {}
+    seen = {}
+    for name, value in raw_headers:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        key = seen.setdefault(name.lower(), name)
+        if key in headers:
+            headers[key] = f'{headers[key]}, {value}'
+        else:
+            headers[key] = value
+    return headers
+
+
+def classify_httpx_error(exc):
+    """Failure reason for an httpx exception, matching classify_fetch_error"""
+    if isinstance(exc, (httpx.InvalidURL, httpx.UnsupportedProtocol)):
+        return 'invalid_url'
+    if isinstance(exc, httpx.TooManyRedirects):
+        return 'redirects'
+    if isinstance(exc, httpx.TimeoutException):
+        return 'timeout'
+    if isinstance(exc, httpx.ConnectError):
+        causes = list(iter_causes(exc))
+        if any(isinstance(cause, ssl.SSLCertVerificationError) for cause in causes):
+            return 'certificate'
+        if any(isinstance(cause, ssl.SSLError) for cause in causes):
+            return 'tls'
+        if any(isinstance(cause, socket.gaierror) for cause in causes):
+            return 'dns'
+        return 'connect'
+    return 'http'
+
+
+def hop_from_response(response):
+    """Hop for a redirect response from httpx's response.history"""
+    location = response.headers.get('location')
+    return Hop(
+        url=str(response.url),
+        status_code=response.status_code,
+        headers=fold_headers(response.headers.raw),
+        cookies=parse_set_cookies(response.headers.get_list('set-cookie')),
+        location=urljoin(str(response.url), location) if location else None,
+        elapsed=response.elapsed.total_seconds(),
+    )
+
+
+class _PhaseTracer:
+    """
+    httpx 'trace' extension callback that times TCP connects and TLS
+    handshakes, and hands each new TLS connection to the TLS cache
+    """
+
+    PHASES = {'connection.connect_tcp': 'connect', 'connection.start_tls': 'tls'}
+
+    def __init__(self, timings):
+        self.timings = timings
+        self._started = {}
+        self._address = None
+
+    async def __call__(self, event_name, info):
+        name, _, stage = event_name.rpartition('.')
+        phase = self.PHASES.get(name)
+        if phase is None:
+            return
+        if stage == 'started':
+            self._started[name] = time.perf_counter()
+            if phase == 'connect':
+                self._address = (info.get('host'), info.get('port'))
+        elif name in self._started:
+            elapsed = time.perf_counter() - self._started.pop(name)
+            self.timings[phase] = self.timings.get(phase, 0.0) + elapsed
+            if phase == 'tls' and stage == 'complete' and self._address:
+                self._inspect(info.get('return_value'))
+
+    def _inspect(self, stream):
+        ssl_object = stream.get_extra_info('ssl_object') if stream is not None else None
+        if ssl_object is not None:
+            host, port = self._address
+            tls_cache.record(ssl_object, host.decode('ascii') if isinstance(host, bytes) else host, port)
+
+
+class AsyncSecurityScanner:
+    """
+    Non-blocking counterpart of SecurityScanner.
+    Use as an async context manager so the underlying connection pool is closed:
+
+        async with AsyncSecurityScanner() as scanner:
+            result = await scanner.scan_url(url)
+    """
+
+    def __init__(self, max_concurrency=100, timeout=None, fetch_mode=None, max_body_bytes=None, max_redirects=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = SecurityScanner.timeout if timeout is None else timeout
+        self.fetch_mode = SecurityScanner.fetch_mode if fetch_mode is None else fetch_mode
+        self.max_body_bytes = SecurityScanner.max_body_bytes if max_body_bytes is None else max_body_bytes
+        self.max_redirects = SecurityScanner.max_redirects if max_redirects is None else max_redirects
+        self.client = None
+        self.unverified_client = None  # for sites whose certificate does not verify, opened when needed
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _new_client(self, verify=True):
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            max_redirects=self.max_redirects,
+            timeout=self.timeout,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=self.max_concurrency),
+            verify=verify,
+        )
+
+    async def __aenter__(self):
+        self.client = self._new_client()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+        self.client = None
+        if self.unverified_client is not None:
+            await self.unverified_client.aclose()
+            self.unverified_client = None
+
+    async def scan_url(self, url):
+        """
+        Scan a URL and return security analysis
+        Returns: dict with score, issues, headers, status_code, final_url,
+        redirects, tls and timings. DNS lookups are part of the connect phase here,
+        and redirects are followed by httpx without the redirect target cache.
+        """
+        timings = {}
+        verify_error = None
+        async with self._semaphore:
+            metrics.SCANS_IN_FLIGHT.inc()
+            try:
+                started = time.perf_counter()
+                try:
+                    response = await self._fetch(url, _PhaseTracer(timings))
+                except (httpx.HTTPError, httpx.InvalidURL) as e:
+                    reason = classify_httpx_error(e)
+                    response = await self._fetch_unverified(url, timings, e) if reason == 'certificate' else None
+                    if response is None:
+                        record_failure(reason)
+                        raise ScanError(f"Failed to fetch URL: {str(e)}", reason) from e
+                    verify_error = certificate_verify_error(e)
+                timings['fetch'] = time.perf_counter() - started
+            finally:
+                metrics.SCANS_IN_FLIGHT.dec()
+        hops = [hop_from_response(hop) for hop in response.history]
+        if hops:
+            timings['redirect'] = sum(hop.elapsed for hop in hops)
+
+        tls = tls_for_url(str(response.url))
+        if verify_error is not None and tls is not None:
+            tls = unverified_tls(tls, verify_error)
+
+        started = time.perf_counter()
+        result = SecurityScanner().analyze(
+            final_url=str(response.url),
+            status_code=response.status_code,
+            headers=fold_headers(response.headers.raw),
+            cookies=parse_set_cookies(response.headers.get_list('set-cookie')),
+            hops=hops,
+            tls=tls,
+        )
+        timings['analysis'] = time.perf_counter() - started
+        result['timings'] = record_timings(timings, 'done')
+        return result
+
+    async def _fetch(self, url, tracer, client=None):
+        """Same strategy as SecurityScanner._fetch: HEAD first if enabled, then a bounded GET"""
+        client = client or self.client
+        extensions = {'trace': tracer}
+        if self.fetch_mode == FETCH_HEAD:
+            response = await client.head(url, extensions=extensions)
+            if response.status_code not in HEAD_FALLBACK_STATUSES:
+                return response
+
+        async with client.stream('GET', url, extensions=extensions) as response:
+            received = 0
+            if self.max_body_bytes > 0:
+                async for chunk in response.aiter_raw():
+                    received += len(chunk)
+                    if received >= self.max_body_bytes:
+                        break
+        return response
+
+    async def _fetch_unverified(self, url, timings, error):
+        """Same as SecurityScanner._fetch_unverified, over a client that does not verify certificates"""
+        if self.unverified_client is None:
+            self.unverified_client = self._new_client(verify=False)
+        try:
+            response = await self._fetch(url, _PhaseTracer(timings), self.unverified_client)
+        except (httpx.HTTPError, httpx.InvalidURL):
+            return None
+        try:
+            failed = urlsplit(str(error.request.url))
+        except RuntimeError:  # no request attached
+            return None
+        if failed.netloc != urlsplit(str(response.url)).netloc:
+            return None
+        return response
+
+    async def _scan_tagged(self, url):
+        try:
+            return url, await self.scan_url(url), None
+        except Exception as e:
+            return url, None, str(e)
+
+    async def scan_many(self, urls):
+        """
+        Scan an iterable of URLs, yielding (url, result, error) tuples as
+        each scan finishes. At most `max_concurrency` scans are in flight,
+        so `urls` may be an arbitrarily long generator.
+        """
+        urls = iter(urls)
+        pending = set()
+        while True:
+            while len(pending) < self.max_concurrency:
+                url = next(urls, None)
+                if url is None:
+                    break
+                pending.add(asyncio.ensure_future(self._scan_tagged(url)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
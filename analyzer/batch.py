@@ -0,0 +1,190 @@
+"""
+Batch Scanner
+Fans a list of URLs out over a scan executor with per-host limits,
+and runs site crawls in the background
+"""
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .crawler import Crawler, rollup
+from .executors import ThreadExecutor
+from .models import ScanBatch, SiteCrawl
+from .scanner import normalize_url
+from .services import save_scan_results
+
+
+def parse_url_list(lines):
+    """
+    Turn lines of text into a de-duplicated list of normalized URLs.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    urls = OrderedDict()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        urls[normalize_url(line)] = None
+    return list(urls)
+
+
+def interleave_by_host(urls):
+    """
+    Reorder URLs round-robin by host so that workers are not all stuck
+    waiting on the per-host limit of the same site
+    """
+    by_host = OrderedDict()
+    for url in urls:
+        by_host.setdefault(urlparse(url).hostname or '', []).append(url)
+
+    queues = [iter(group) for group in by_host.values()]
+    while queues:
+        remaining = []
+        for queue in queues:
+            url = next(queue, None)
+            if url is not None:
+                yield url
+                remaining.append(queue)
+        queues = remaining
+
+
+class BatchRunner:
+    """
+    Runs a ScanBatch on a scan executor (a thread pool unless another one
+    is given, see analyzer.executors).
+    Network fetches happen in the executor, while results are written to
+    the database from the calling thread only, `flush_size` results per
+    transaction (or whatever has arrived after `flush_interval` seconds).
+    """
+
+    def __init__(self, max_workers=16, per_host=2, flush_size=50, flush_interval=2.0, executor=None):
+        self.executor = executor or ThreadExecutor(max_workers=max_workers, per_host=per_host)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+    def _flush(self, batch, pending):
+        with transaction.atomic():
+            if pending:
+                save_scan_results(pending, owner=batch.owner, batch=batch)
+            batch.save(update_fields=['completed', 'failed'])
+        pending.clear()
+
+    def run(self, batch, urls, on_progress=None):
+        """Scan every URL and record the results against the batch"""
+        batch.status = 'running'
+        batch.total = len(urls)
+        batch.save(update_fields=['status', 'total'])
+
+        errors = {}
+        pending = []
+        last_flush = time.monotonic()
+        for url, result_data, error in self.executor.scan_many(interleave_by_host(urls)):
+            if error:
+                errors[url] = error
+                batch.failed += 1
+            else:
+                pending.append((url, result_data))
+                batch.completed += 1
+
+            if len(pending) >= self.flush_size or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush(batch, pending)
+                last_flush = time.monotonic()
+            if on_progress:
+                on_progress(batch)
+
+        self._flush(batch, pending)
+        batch.errors = errors
+        batch.status = 'done'
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=['errors', 'status', 'finished_at'])
+        return batch
+
+
+def start_batch(batch, urls, **runner_options):
+    """Run a batch on a background thread and return immediately"""
+    def target():
+        try:
+            BatchRunner(**runner_options).run(ScanBatch.objects.get(pk=batch.pk), urls)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=target, name=f'scan-batch-{batch.id}', daemon=True)
+    thread.start()
+    return thread
+
+
+class CrawlRunner:
+    """
+    Runs a SiteCrawl. Like BatchRunner, pages are written from the calling
+    thread only, `flush_size` at a time, and the rolled-up site result is
+    stored on the crawl at the end.
+    """
+
+    def __init__(self, flush_size=50, **crawler_options):
+        self.flush_size = flush_size
+        self.crawler_options = crawler_options
+
+    def _flush(self, crawl, pending):
+        with transaction.atomic():
+            if pending:
+                save_scan_results(pending, owner=crawl.owner, crawl=crawl)
+            crawl.save(update_fields=['pages_scanned', 'pages_failed'])
+        pending.clear()
+
+    def run(self, crawl):
+        crawl.status = 'running'
+        crawl.save(update_fields=['status'])
+
+        errors = {}
+        pending = []
+
+        def on_page(page):
+            if page.error:
+                errors[page.url] = page.error
+                crawl.pages_failed += 1
+            else:
+                pending.append((page.url, page.result))
+                crawl.pages_scanned += 1
+            if len(pending) >= self.flush_size:
+                self._flush(crawl, pending)
+
+        crawler = Crawler(max_pages=crawl.max_pages, max_depth=crawl.max_depth, **self.crawler_options)
+        try:
+            pages = crawler.crawl(crawl.url, on_page=on_page)
+            self._flush(crawl, pending)
+        except Exception as e:
+            # Pages already flushed are kept; the error is stored under 'crawl'
+            errors['crawl'] = str(e)
+            crawl.refresh_from_db(fields=['pages_scanned', 'pages_failed'])
+            crawl.errors = errors
+            crawl.status = 'failed'
+            crawl.finished_at = timezone.now()
+            crawl.save(update_fields=['errors', 'status', 'finished_at'])
+            return crawl
+
+        summary = rollup(pages)
+        crawl.score = summary['score']
+        crawl.average_score = summary['average_score']
+        crawl.issues = summary['issues']
+        crawl.errors = errors
+        crawl.status = 'done' if summary['pages_scanned'] else 'failed'
+        crawl.finished_at = timezone.now()
+        crawl.save(update_fields=['score', 'average_score', 'issues', 'errors', 'status', 'finished_at'])
+        return crawl
+
+
+def start_crawl(crawl, **runner_options):
+    """Run a crawl on a background thread and return immediately"""
+    def target():
+        try:
+            CrawlRunner(**runner_options).run(SiteCrawl.objects.get(pk=crawl.pk))
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=target, name=f'site-crawl-{crawl.id}', daemon=True)
+    thread.start()
+    return thread
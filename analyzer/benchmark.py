@@ -0,0 +1,300 @@
+"""
+Benchmarks
+Measures scanner throughput and view latency against a local stub server,
+and concurrent write throughput of the database, and reports scans/sec,
+writes/sec, latency percentiles, DB queries per request and peak RSS
+"""
+import asyncio
+import platform
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .async_scanner import AsyncSecurityScanner
+from .cache import get_scan_cache
+from .db import BatchedWriter
+from .models import ScanResult
+from .scanner import SecurityScanner
+from .services import complete_scan_result, save_scan_results
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (in milliseconds) for one run"""
+    return {
+        'count': len(latencies),
+        'per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS, KiB elsewhere
+
+
+def bench_scanner(url, concurrency_levels, scans_per_level):
+    """SecurityScanner on a thread pool, one run per concurrency level"""
+    def timed_scan(_):
+        started = time.perf_counter()
+        try:
+            SecurityScanner().scan_url(url)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    runs = []
+    for concurrency in concurrency_levels:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed_scan, range(scans_per_level)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency in outcomes if latency is not None]
+        runs.append({
+            'engine': 'sync',
+            'concurrency': concurrency,
+            'failures': len(outcomes) - len(latencies),
+            **summarize(latencies, elapsed),
+        })
+    return runs
+
+
+def bench_async_scanner(url, concurrency_levels, scans_per_level):
+    """AsyncSecurityScanner on one event loop, one run per concurrency level"""
+    async def run(concurrency):
+        # Time each scan from when it gets a slot, like the thread pool does
+        slots = asyncio.Semaphore(concurrency)
+        async with AsyncSecurityScanner(max_concurrency=concurrency) as scanner:
+            async def timed_scan():
+                async with slots:
+                    started = time.perf_counter()
+                    try:
+                        await scanner.scan_url(url)
+                    except Exception:
+                        return None
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(timed_scan() for _ in range(scans_per_level)))
+            return outcomes, time.perf_counter() - started
+
+    runs = []
+    for concurrency in concurrency_levels:
+        outcomes, elapsed = asyncio.run(run(concurrency))
+        latencies = [latency for latency in outcomes if latency is not None]
+        runs.append({
+            'engine': 'async',
+            'concurrency': concurrency,
+            'failures': len(outcomes) - len(latencies),
+            **summarize(latencies, elapsed),
+        })
+    return runs
+
+
+SAMPLE_ISSUES = [
+    {'severity': 'high', 'category': 'Content-Security-Policy', 'message': 'Missing Content-Security-Policy header',
+     'recommendation': 'Add CSP header to prevent XSS attacks and control resource loading.'},
+    {'severity': 'medium', 'category': 'Referrer-Policy', 'message': 'Missing Referrer-Policy header',
+     'recommendation': 'Add Referrer-Policy header to control referrer information sent to other sites.'},
+    {'severity': 'low', 'category': 'Cookie Security', 'message': 'Cookie "session" missing SameSite attribute',
+     'recommendation': 'Set SameSite attribute on cookies to prevent CSRF attacks (use Strict or Lax).'},
+]
+
+
+def bench_views(target_url, requests_per_view, seed_scans=500):
+    """
+    Latency and DB queries per request for the scan, result and history
+    views. Writes to the current database, so run it against a test database.
+    """
+    user = User.objects.create_user(f'bench-{timezone.now().timestamp():.0f}', password='bench')
+    result_data = {
+        'final_url': target_url,
+        'status_code': 200,
+        'score': 62,
+        'headers': {'Server': 'stub', 'Date': 'Thu, 01 Jan 2026 00:00:00 GMT', 'X-Frame-Options': 'DENY'},
+        'issues': SAMPLE_ISSUES,
+    }
+    scans = save_scan_results([(f'{target_url}?seed={i}', result_data) for i in range(seed_scans)], owner=user)
+
+    client = Client()
+    client.force_login(user)
+
+    views = {
+        'scan': lambda i: client.post(reverse('scan'), {'url': f'{target_url}?bench={i}', 'force': '1'}),
+        'result': lambda i: client.get(reverse('result', args=[scans[i % len(scans)].id])),
+        'history': lambda i: client.get(reverse('history')),
+        'my_scans': lambda i: client.get(reverse('my_scans')),
+    }
+
+    report = {}
+    for name, request in views.items():
+        latencies = []
+        queries = 0
+        errors = 0
+        started = time.perf_counter()
+        for i in range(requests_per_view):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = request(i)
+                latencies.append(time.perf_counter() - request_started)
+            queries += len(captured.captured_queries)
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        report[name] = {
+            'errors': errors,
+            'queries_per_request': round(queries / requests_per_view, 2) if requests_per_view else 0.0,
+            **summarize(latencies, elapsed),
+        }
+    return report
+
+
+def _write_jobs(jobs, write, concurrency):
+    """Store `jobs` with write(job) from `concurrency` threads; returns (latencies, failures, seconds)"""
+    jobs = iter(jobs)
+    lock = threading.Lock()
+    latencies = []
+    failures = []
+
+    def work():
+        try:
+            while True:
+                with lock:
+                    job = next(jobs, None)
+                if job is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    write(job)
+                except DatabaseError as e:
+                    failures.append(str(e))
+                else:
+                    latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work, name=f'bench-writer-{i}') for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, time.perf_counter() - started
+
+
+def bench_db_writes(concurrency_levels, writes_per_level, batch_size=50):
+    """
+    Concurrent write throughput of the configured database: threads
+    completing queued scan jobs the way scan workers do, once with every
+    thread writing on its own connection (direct) and once through a
+    BatchedWriter (batched). Writes to the current database, so run it
+    against a test database.
+    """
+    result_data = {
+        'final_url': 'https://bench.example/',
+        'status_code': 200,
+        'score': 62,
+        'headers': {'Server': 'stub', 'Date': 'Thu, 01 Jan 2026 00:00:00 GMT', 'X-Frame-Options': 'DENY'},
+        'issues': SAMPLE_ISSUES,
+    }
+    # Time the database, not the file-based scan cache shared between processes
+    scan_cache = get_scan_cache()
+    alias, scan_cache.alias = scan_cache.alias, 'default'
+
+    runs = []
+    try:
+        for mode in ('direct', 'batched'):
+            for concurrency in concurrency_levels:
+                jobs = ScanResult.objects.bulk_create([
+                    ScanResult(url=f'https://bench.example/{mode}/{concurrency}/{i}', status='running')
+                    for i in range(writes_per_level)
+                ])
+                if mode == 'batched':
+                    with BatchedWriter(batch_size=batch_size) as writer:
+                        outcome = _write_jobs(jobs, lambda job: writer.call(complete_scan_result, job, result_data),
+                                              concurrency)
+                else:
+                    outcome = _write_jobs(jobs, lambda job: complete_scan_result(job, result_data), concurrency)
+
+                latencies, failures, elapsed = outcome
+                runs.append({
+                    'mode': mode,
+                    'concurrency': concurrency,
+                    'failures': len(failures),
+                    'errors': sorted(set(failures))[:3],
+                    **summarize(latencies, elapsed),
+                })
+    finally:
+        scan_cache.alias = alias
+    return runs
+
+
+def environment():
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+    }
+
+
+def compare(current, baseline):
+    """Lines describing how `current` differs from a `baseline` report"""
+    def delta(new, old):
+        if not old:
+            return 'n/a'
+        return f'{(new - old) / old * 100:+.1f}%'
+
+    lines = []
+    old_runs = {(run['engine'], run['concurrency']): run for run in baseline.get('scanner', [])}
+    for run in current.get('scanner', []):
+        old = old_runs.get((run['engine'], run['concurrency']))
+        if old:
+            lines.append(
+                f"scanner {run['engine']} c={run['concurrency']}: "
+                f"{run['per_sec']} scans/s ({delta(run['per_sec'], old['per_sec'])}), "
+                f"p95 {run['p95_ms']} ms ({delta(run['p95_ms'], old['p95_ms'])})"
+            )
+    for name, view in current.get('views', {}).items():
+        old = baseline.get('views', {}).get(name)
+        if old:
+            lines.append(
+                f"view {name}: p95 {view['p95_ms']} ms ({delta(view['p95_ms'], old['p95_ms'])}), "
+                f"{view['queries_per_request']} queries/request (was {old['queries_per_request']})"
+            )
+    old_writes = {(run['mode'], run['concurrency']): run for run in baseline.get('db_writes', [])}
+    for run in current.get('db_writes', []):
+        old = old_writes.get((run['mode'], run['concurrency']))
+        if old:
+            lines.append(
+                f"db writes {run['mode']} c={run['concurrency']}: "
+                f"{run['per_sec']} writes/s ({delta(run['per_sec'], old['per_sec'])}), "
+                f"p95 {run['p95_ms']} ms ({delta(run['p95_ms'], old['p95_ms'])})"
+            )
+    if 'peak_rss_kb' in baseline:
+        lines.append(f"peak RSS {current['peak_rss_kb']} KiB ({delta(current['peak_rss_kb'], baseline['peak_rss_kb'])})")
+    return lines
@@ -0,0 +1,156 @@
+"""
+Scan Result Cache
+Maps normalized URLs to their most recent completed ScanResult so repeated
+scans of the same URL can reuse it, first from an in-process LRU and then
+from a shared Django cache backend
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_cache_url(url):
+    """Lowercase scheme and host, drop default ports and fragments"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CacheEntry:
+    """Cached pointer to a ScanResult plus the validators for revalidation"""
+
+    __slots__ = ('scan_id', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, scan_id, etag=None, last_modified=None, expires_at=0.0):
+        self.scan_id = scan_id
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self):
+        return time.time() < self.expires_at
+
+    @property
+    def can_revalidate(self):
+        return bool(self.etag or self.last_modified)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ScanCache:
+    """
+    Two-level cache: a bounded in-process LRU in front of a Django cache
+    backend shared by every process on the host. Entries are fresh for
+    `ttl` seconds and kept for `stale_ttl` seconds so expired ones can still
+    be revalidated with a conditional request.
+    """
+
+    def __init__(self, ttl=3600, stale_ttl=7 * 24 * 3600, max_entries=1024, alias='default'):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _key(self, url):
+        digest = hashlib.sha256(normalize_cache_url(url).encode('utf-8')).hexdigest()
+        return f'scan:{digest}'
+
+    def get(self, url):
+        """
+        Return the CacheEntry for url, fresh or stale, or None. A stale local
+        entry is checked against the shared backend, where another process
+        may have stored a newer result.
+        """
+        key = self._key(url)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry.is_fresh:
+                self._local.move_to_end(key)
+                return entry
+
+        data = self.backend.get(key)
+        if data is None:
+            with self._lock:
+                self._local.pop(key, None)
+            return None
+        entry = CacheEntry(**data)
+        self._remember(key, entry)
+        return entry
+
+    def store(self, url, scan_result, headers=None):
+        """Point url at a completed ScanResult whose response had `headers`"""
+        if headers is None:
+            headers = scan_result.headers
+        entry = CacheEntry(
+            scan_id=scan_result.id,
+            etag=_header(headers, 'ETag'),
+            last_modified=_header(headers, 'Last-Modified'),
+            expires_at=time.time() + self.ttl,
+        )
+        key = self._key(url)
+        self.backend.set(key, entry.to_dict(), timeout=self.stale_ttl)
+        self._remember(key, entry)
+        return entry
+
+    def invalidate(self, url):
+        key = self._key(url)
+        self.backend.delete(key)
+        with self._lock:
+            self._local.pop(key, None)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+_scan_cache = None
+_scan_cache_lock = threading.Lock()
+
+
+def get_scan_cache():
+    """Return the process-wide ScanCache configured from settings"""
+    global _scan_cache
+    if _scan_cache is None:
+        with _scan_cache_lock:
+            if _scan_cache is None:
+                _scan_cache = ScanCache(
+                    ttl=getattr(settings, 'SCAN_CACHE_TTL', 3600),
+                    stale_ttl=getattr(settings, 'SCAN_CACHE_STALE_TTL', 7 * 24 * 3600),
+                    max_entries=getattr(settings, 'SCAN_CACHE_MAX_ENTRIES', 1024),
+                    alias=getattr(settings, 'SCAN_CACHE_ALIAS', 'default'),
+                )
+    return _scan_cache
@@ -0,0 +1,179 @@
+"""
+Command-line Scanner
+Scans URLs without Django: reads URLs, or NDJSON objects with a "url"
+field, from a file or standard input and writes one JSON line per scan to
+standard output as each scan finishes. Input is only read as fast as scans
+finish, so memory use stays flat however long the list is.
+
+    python -m analyzer.scanner urls.txt --concurrency 100 > results.ndjson
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from .async_scanner import AsyncSecurityScanner
+from .rules import load_ruleset
+from .scanner import FETCH_GET, FETCH_HEAD, ScanError, SecurityScanner, normalize_url
+
+
+def parse_line(line):
+    """
+    (url, extra fields) of an input line: a bare URL, or a JSON object with
+    a "url" field whose other fields are copied to the output line. Blank
+    lines and lines starting with '#' give None; raises ValueError for an
+    object without a URL or a line that is not valid JSON.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    if not line.startswith('{'):
+        return normalize_url(line), {}
+
+    record = json.loads(line)
+    url = record.pop('url', None) if isinstance(record, dict) else None
+    if not isinstance(url, str) or not url.strip():
+        raise ValueError('no "url" field')
+    return normalize_url(url), record
+
+
+class HostSlots:
+    """
+    Caps how many scans may hit the same host at once. A host's semaphore
+    is dropped once none of its scans are in flight, so a long run does not
+    keep one per host it has seen.
+    """
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._slots = {}
+
+    @asynccontextmanager
+    async def limit(self, url):
+        host = urlparse(url).hostname or ''
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._slots[host]
+
+
+async def scan_lines(lines, write, concurrency=50, per_host=2, on_invalid=None, **scanner_options):
+    """
+    Scan the URLs of input `lines` with at most `concurrency` scans in
+    flight, calling write(output dict) as each finishes. Lines are read on
+    a thread, so a slow producer on a pipe does not stall scans in flight.
+    `on_invalid(line number, error)` is called for lines that cannot be
+    parsed. Returns (scanned, failed) counts.
+    """
+    hosts = HostSlots(per_host)
+    lines = iter(lines)
+    scanned = failed = number = 0
+    pending = set()
+
+    async with AsyncSecurityScanner(max_concurrency=concurrency, **scanner_options) as scanner:
+        async def scan(url, extra):
+            async with hosts.limit(url):
+                try:
+                    return {**extra, 'url': url, **await scanner.scan_url(url)}
+                except ScanError as e:
+                    return {**extra, 'url': url, 'error': str(e), 'reason': e.reason}
+                except Exception as e:
+                    return {**extra, 'url': url, 'error': str(e), 'reason': 'internal'}
+
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                line = await asyncio.to_thread(next, lines, None)
+                if line is None:
+                    exhausted = True
+                    break
+                number += 1
+                try:
+                    parsed = parse_line(line)
+                except ValueError as e:
+                    if on_invalid:
+                        on_invalid(number, e)
+                    continue
+                if parsed is not None:
+                    pending.add(asyncio.ensure_future(scan(*parsed)))
+
+            if not pending:
+                return scanned, failed
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                output = task.result()
+                scanned += 1
+                failed += 'error' in output
+                write(output)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m analyzer.scanner',
+        description='Scan URLs (one per line, or NDJSON objects with a "url" field) and write one JSON line '
+                    'per result to standard output as scans finish.',
+    )
+    parser.add_argument('input', nargs='?', default='-', help='File to read, or - for standard input (default)')
+    parser.add_argument('--concurrency', type=int, default=50, help='Scans in flight at once')
+    parser.add_argument('--per-host', type=int, default=2, help='Scans of the same host in flight at once')
+    parser.add_argument('--timeout', type=float, default=SecurityScanner.timeout, help='Seconds per request')
+    parser.add_argument('--fetch-mode', choices=[FETCH_GET, FETCH_HEAD], default=SecurityScanner.fetch_mode,
+                        help='Streamed GET, or HEAD first with GET as fallback')
+    parser.add_argument('--max-body-bytes', type=int, default=SecurityScanner.max_body_bytes,
+                        help='Body bytes read before the connection is closed')
+    parser.add_argument('--rules', help='Header rules file (JSON or YAML) instead of the bundled rules')
+    parser.add_argument('--quiet', action='store_true', help='Do not write a summary to standard error')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.concurrency < 1 or args.per_host < 1:
+        print('--concurrency and --per-host must be at least 1', file=sys.stderr)
+        return 2
+    if args.rules:
+        SecurityScanner.header_rules = load_ruleset(args.rules)
+
+    def write(output):
+        sys.stdout.write(json.dumps(output, separators=(',', ':')) + '\n')
+        sys.stdout.flush()
+
+    def on_invalid(number, error):
+        print(f'line {number}: skipped, {error}', file=sys.stderr)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    started = time.monotonic()
+    try:
+        scanned, failed = asyncio.run(scan_lines(
+            source, write,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            on_invalid=on_invalid,
+            timeout=args.timeout,
+            fetch_mode=args.fetch_mode,
+            max_body_bytes=args.max_body_bytes,
+        ))
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); point stdout at
+        # /dev/null so flushing it at exit does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if not args.quiet:
+        print(f'Scanned {scanned} URLs ({failed} failed) in {time.monotonic() - started:.1f}s', file=sys.stderr)
+    return 0
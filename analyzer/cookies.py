@@ -0,0 +1,92 @@
+"""
+Set-Cookie Parsing
+Reads the raw Set-Cookie header lines of a response in one pass into compact
+per-cookie records. Unlike a cookie jar, nothing is dropped (cookies for
+another domain, or rejected by a jar's policy) and repeated Set-Cookie
+headers are never folded together, so every cookie a response sets is
+checked and stored as it was sent.
+"""
+
+
+class SetCookie:
+    """The attributes of one Set-Cookie header that the checks look at"""
+
+    __slots__ = ('name', 'secure', 'httponly', 'samesite', 'domain', 'path', 'expires', 'max_age')
+
+    def __init__(self, name, secure=False, httponly=False, samesite=None, domain=None, path=None,
+                 expires=None, max_age=None):
+        self.name = name
+        self.secure = secure
+        self.httponly = httponly
+        self.samesite = samesite      # as sent, e.g. 'Lax'; None when missing
+        self.domain = domain
+        self.path = path
+        self.expires = expires        # the date as sent
+        self.max_age = max_age        # seconds
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'secure': self.secure,
+            'httponly': self.httponly,
+            'samesite': self.samesite,
+            'domain': self.domain,
+            'path': self.path,
+            'expires': self.expires,
+            'max_age': self.max_age,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """SetCookie from a stored to_dict(), including the shorter form older scans stored"""
+        return cls(
+            data['name'], secure=data.get('secure', False), httponly=data.get('httponly', False),
+            samesite=data.get('samesite'), domain=data.get('domain'), path=data.get('path'),
+            expires=data.get('expires'), max_age=data.get('max_age'),
+        )
+
+
+def parse_set_cookie(line):
+    """
+    SetCookie for one Set-Cookie header value, following RFC 6265 section
+    5.2: attribute names are case-insensitive, unknown attributes are
+    ignored and a repeated attribute takes its last value. Returns None for
+    a header without a name=value pair.
+    """
+    pair, *attributes = line.split(';')
+    name, equals, _ = pair.partition('=')
+    name = name.strip()
+    if not equals or not name:
+        return None
+
+    cookie = SetCookie(name)
+    for attribute in attributes:
+        key, _, value = attribute.partition('=')
+        key = key.strip().lower()
+        if key == 'secure':
+            cookie.secure = True
+        elif key == 'httponly':
+            cookie.httponly = True
+        elif key == 'samesite':
+            cookie.samesite = value.strip() or None
+        elif key == 'domain':
+            cookie.domain = value.strip().lstrip('.').lower() or None
+        elif key == 'path':
+            cookie.path = value.strip() or None
+        elif key == 'expires':
+            cookie.expires = value.strip() or None
+        elif key == 'max-age':
+            value = value.strip()
+            if value.isdigit() or (value[:1] == '-' and value[1:].isdigit()):
+                cookie.max_age = int(value)
+    return cookie
+
+
+def parse_set_cookies(lines):
+    """SetCookies of a response's Set-Cookie header values, in the order they were sent"""
+    cookies = []
+    for line in lines:
+        cookie = parse_set_cookie(line)
+        if cookie is not None:
+            cookies.append(cookie)
+    return cookies
@@ -0,0 +1,226 @@
+"""
+Site Crawler
+Scans a site page by page: same-origin links are extracted from each HTML
+body while it streams in, and fed to a bounded, deduplicated frontier that
+is fetched in parallel under a per-host rate limit
+"""
+import codecs
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from .scanner import ScanError, SecurityScanner, record_failure
+from .transport import Transport
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Links to these are assets, not pages, and are never queued
+SKIPPED_EXTENSIONS = frozenset({
+    '7z', 'avi', 'bmp', 'css', 'csv', 'doc', 'docx', 'eot', 'exe', 'gif', 'gz', 'ico', 'jpeg', 'jpg',
+    'js', 'json', 'mov', 'mp3', 'mp4', 'otf', 'pdf', 'png', 'ppt', 'pptx', 'rar', 'svg', 'tar', 'tgz',
+    'ttf', 'txt', 'wav', 'webm', 'webp', 'woff', 'woff2', 'xls', 'xlsx', 'xml', 'zip',
+})
+
+SEVERITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def canonical_url(url):
+    """
+    Frontier key for a URL: lowercase scheme and host, no default port,
+    no fragment. Returns None for anything that is not http(s).
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f'{host}:{port}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
+def is_page_link(url):
+    """False for links that obviously point at static assets"""
+    last_segment = urlsplit(url).path.rsplit('/', 1)[-1]
+    extension = last_segment.rsplit('.', 1)[-1].lower() if '.' in last_segment else ''
+    return extension not in SKIPPED_EXTENSIONS
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Incremental HTML parser collecting the targets of <a>, <area>, <form>
+    and <iframe>, resolved against the page URL (or its <base href>).
+    Feed it raw body chunks as they arrive.
+    """
+
+    LINK_ATTRIBUTES = {'a': 'href', 'area': 'href', 'form': 'action', 'iframe': 'src'}
+
+    def __init__(self, page_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = page_url
+        self.links = []
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed_bytes(self, chunk):
+        self.feed(self._decoder.decode(chunk))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'base':
+            href = dict(attrs).get('href')
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+            return
+        attribute = self.LINK_ATTRIBUTES.get(tag)
+        if attribute is None:
+            return
+        value = dict(attrs).get(attribute)
+        if value:
+            self.links.append(urljoin(self.base_url, value.strip()))
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot.get(host, now), now)
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CrawlPage:
+    """Outcome of scanning one page of a crawl"""
+
+    __slots__ = ('url', 'depth', 'result', 'error', 'links')
+
+    def __init__(self, url, depth, result=None, error=None, links=()):
+        self.url = url
+        self.depth = depth
+        self.result = result
+        self.error = error
+        self.links = list(links)
+
+
+class Crawler:
+    """
+    Breadth-first crawl of one origin, scanning at most `max_pages` pages
+    up to `max_depth` links away from the start URL with `concurrency`
+    pages in flight. Pages are fetched over a transport of their own, sized
+    so every in-flight page keeps a keep-alive connection.
+    """
+
+    def __init__(self, max_pages=100, max_depth=3, concurrency=8, rate_per_host=50, max_body_bytes=512 * 1024):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.rate_limiter = HostRateLimiter(rate_per_host)
+        self.max_body_bytes = max_body_bytes
+
+    def _scan_page(self, transport, url, depth):
+        self.rate_limiter.wait(url)
+        extractor = LinkExtractor(url)
+        scanner = SecurityScanner(transport=transport, max_body_bytes=self.max_body_bytes)
+        try:
+            result = scanner.scan_url(url, on_html=extractor.feed_bytes)
+            extractor.close()
+        except ScanError as e:
+            return CrawlPage(url, depth, error=str(e))
+        except Exception as e:
+            # e.g. a parser error: the page fails, the crawl goes on
+            record_failure('internal')
+            return CrawlPage(url, depth, error=str(e))
+        return CrawlPage(url, depth, result=result, links=extractor.links)
+
+    def crawl(self, start_url, on_page=None):
+        """
+        Crawl from `start_url` and return the list of CrawlPages in the order
+        they finished. `on_page` is called with each one, from this thread.
+        The origin is taken from where the start URL ends up after redirects.
+        """
+        start = canonical_url(start_url) or start_url
+        seen = {start}
+        origin = None
+        pages = []
+
+        transport = Transport(pool_connections=4, pool_maxsize=self.concurrency)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                in_flight = {pool.submit(self._scan_page, transport, start, 0)}
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page = future.result()
+                        pages.append(page)
+                        if on_page:
+                            on_page(page)
+                        if page.result is None:
+                            continue
+
+                        final = canonical_url(page.result['final_url'])
+                        if origin is None:
+                            origin = origin_of(final or start)
+                        if final:
+                            seen.add(final)
+                        if page.depth >= self.max_depth:
+                            continue
+
+                        for link in page.links:
+                            if len(seen) >= self.max_pages:
+                                break
+                            link = canonical_url(link)
+                            if link is None or link in seen or origin_of(link) != origin or not is_page_link(link):
+                                continue
+                            seen.add(link)
+                            in_flight.add(pool.submit(self._scan_page, transport, link, page.depth + 1))
+        finally:
+            transport.close()
+        return pages
+
+
+def rollup(pages):
+    """
+    Combine the pages of a crawl into one site result. The site score is
+    that of its weakest page; every distinct issue is listed once with the
+    number of pages it was found on.
+    """
+    scanned = [page for page in pages if page.result is not None]
+    scores = [page.result['score'] for page in scanned]
+
+    issues = {}
+    for page in scanned:
+        for issue in page.result['issues']:
+            key = (issue['severity'], issue['category'], issue['message'])
+            entry = issues.get(key)
+            if entry is None:
+                entry = issues[key] = {**issue, 'pages': 0, 'example_url': page.url}
+            entry['pages'] += 1
+
+    return {
+        'score': min(scores) if scores else None,
+        'average_score': round(sum(scores) / len(scores), 2) if scores else None,
+        'pages_scanned': len(scanned),
+        'pages_failed': len(pages) - len(scanned),
+        'issues': sorted(issues.values(), key=lambda issue: (SEVERITY_ORDER.get(issue['severity'], 3), -issue['pages'])),
+    }
@@ -0,0 +1,155 @@
+"""
+Database Tuning
+Connection setup for the SQLite profile, and a single-writer queue that
+lets many threads store results without contending for the database lock.
+
+SQLite allows one writer at a time. In its default rollback-journal mode a
+writer also blocks readers, and every commit waits for the disk. WAL mode
+lets readers carry on during a write, synchronous=NORMAL only syncs at
+checkpoints, and busy_timeout makes a blocked connection wait instead of
+failing with "database is locked". Transactions take the write lock when
+they begin (BEGIN IMMEDIATE): one that read first and then tried to write
+would fail at once, without waiting, if another connection had written in
+between. BatchedWriter goes further: writes from
+every thread run on one thread, many to a transaction, so they never wait
+on each other and the database commits once per batch.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import metrics
+
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+}
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created receiver: apply SQLITE_PRAGMAS and
+    SQLITE_TRANSACTION_MODE to new SQLite connections
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+    mode = getattr(settings, 'SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
+    if mode:
+        # Django 4.2 always begins with a plain (deferred) BEGIN; this is
+        # what the "transaction_mode" database option does from Django 5.1
+        connection._start_transaction_under_autocommit = partial(_begin, connection, mode)
+
+
+def _begin(connection, mode):
+    connection.cursor().execute(f'BEGIN {mode}')
+
+
+_STOP = object()
+
+
+class BatchedWriter:
+    """
+    Runs database writes submitted from any thread on a single writer
+    thread. The writes queued while the previous batch was being written,
+    up to `batch_size`, share one transaction, each in its own savepoint so
+    one failing write does not undo the others; `max_delay` seconds may be
+    spent waiting for more. Results are handed back once the batch has
+    committed. At most `max_pending` writes wait in the
+    queue; submitting more blocks, so producers slow down to the writer's
+    pace instead of queueing without bound.
+    """
+
+    def __init__(self, batch_size=50, max_delay=0.0, max_pending=1000):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Write what is queued, then stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future for its result"""
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the writer and wait until it has committed"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(batch)
+        finally:
+            connections.close_all()
+
+    def _write(self, batch):
+        outcomes = []
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The transaction itself failed: nothing in the batch was stored
+            for future, func, args, kwargs in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        metrics.DB_WRITE_SECONDS.labels('batch').observe(time.perf_counter() - started)
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
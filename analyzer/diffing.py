@@ -0,0 +1,53 @@
+"""
+Scan Diffing
+Computes and applies diffs between two scans of the same target, so that
+repeated monitoring scans only store what changed
+"""
+
+
+def issue_key(issue):
+    """Issues are identified by category and message"""
+    return [issue['category'], issue['message']]
+
+
+def diff_scans(old_headers, old_issues, old_score, new_headers, new_issues, new_score):
+    """
+    Return the changes from one scan to the next:
+        headers: {'set': {name: value}, 'removed': [name]}
+        issues: {'added': [issue dicts], 'removed': [[category, message]]}
+        score_delta: int
+    """
+    header_set = {name: value for name, value in new_headers.items() if old_headers.get(name) != value}
+    header_removed = [name for name in old_headers if name not in new_headers]
+
+    old_keys = {tuple(issue_key(issue)) for issue in old_issues}
+    new_keys = {tuple(issue_key(issue)) for issue in new_issues}
+    added = [issue for issue in new_issues if tuple(issue_key(issue)) not in old_keys]
+    removed = [issue_key(issue) for issue in old_issues if tuple(issue_key(issue)) not in new_keys]
+
+    return {
+        'headers': {'set': header_set, 'removed': header_removed},
+        'issues': {'added': added, 'removed': removed},
+        'score_delta': new_score - old_score,
+    }
+
+
+def apply_diff(headers, issues, diff):
+    """Apply a diff from diff_scans() to a (headers, issues) pair, returning new copies"""
+    headers = dict(headers)
+    for name in diff['headers']['removed']:
+        headers.pop(name, None)
+    headers.update(diff['headers']['set'])
+
+    removed = {tuple(key) for key in diff['issues']['removed']}
+    issues = [issue for issue in issues if tuple(issue_key(issue)) not in removed]
+    issues.extend(diff['issues']['added'])
+    return headers, issues
+
+
+def is_empty(diff):
+    return not (
+        diff['headers']['set'] or diff['headers']['removed']
+        or diff['issues']['added'] or diff['issues']['removed']
+        or diff['score_delta']
+    )
@@ -0,0 +1,223 @@
+"""
+Scan Executors
+Interchangeable backends that scan a stream of URLs and yield
+(url, result, error) tuples as scans finish: a thread pool inside this
+process, or a pool of processes that each run their own async fetch loop so
+that parsing and analysis use every core. Results are only yielded to the
+calling thread, which stays the single database writer. Stored results are
+re-scored on the same worker processes (see analyzer.rescoring).
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from urllib.parse import urlparse
+
+from .async_scanner import AsyncSecurityScanner
+from .scanner import RedirectTargetCache, SecurityScanner
+
+
+class HostLimiter:
+    """Caps how many scans may hit the same host at once"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    @contextmanager
+    def limit(self, url):
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            slot = self._slots.get(host)
+            if slot is None:
+                slot = self._slots[host] = threading.BoundedSemaphore(self.per_host)
+        with slot:
+            yield
+
+
+class ThreadExecutor:
+    """SecurityScanner on a thread pool in this process"""
+
+    def __init__(self, max_workers=16, per_host=2):
+        self.max_workers = max_workers
+        self.hosts = HostLimiter(per_host)
+
+    def _scan(self, url):
+        with self.hosts.limit(url):
+            return SecurityScanner().scan_url(url)
+
+    def scan_many(self, urls):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._scan, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result(), None
+                except Exception as e:
+                    yield url, None, str(e)
+
+
+def scanner_options():
+    """SecurityScanner settings of this process, to be applied in worker processes"""
+    return {
+        'fetch_mode': SecurityScanner.fetch_mode,
+        'max_body_bytes': SecurityScanner.max_body_bytes,
+        'timeout': SecurityScanner.timeout,
+        'header_rules': SecurityScanner.header_rules,
+        'max_redirects': SecurityScanner.max_redirects,
+        # The cache itself holds a lock; each worker process gets its own
+        'redirect_cache': SecurityScanner.redirect_cache and (
+            SecurityScanner.redirect_cache.ttl, SecurityScanner.redirect_cache.max_entries
+        ),
+    }
+
+
+def init_worker_process(options):
+    """Pool initializer: apply the parent's scanner_options() in a worker process"""
+    redirect_cache = options.pop('redirect_cache')
+    SecurityScanner.redirect_cache = RedirectTargetCache(*redirect_cache) if redirect_cache else None
+    for name, value in options.items():
+        setattr(SecurityScanner, name, value)
+
+
+def _pack(url, result, error):
+    """
+    Compact tuple form of a scan outcome for sending between processes.
+    Issues become tuples; rule texts shared by many results are the same
+    string objects, which pickle stores once per chunk.
+    """
+    if result is None:
+        return url, error
+    issues = tuple(
+        (issue['severity'], issue['category'], issue['message'], issue['recommendation'])
+        for issue in result['issues']
+    )
+    return (url, result['final_url'], result['status_code'], result['score'],
+            result['headers'], issues, result['redirects'], result['tls'], result['cookies'], result['timings'])
+
+
+def _unpack(packed):
+    if len(packed) == 2:
+        url, error = packed
+        return url, None, error
+    url, final_url, status_code, score, headers, issues, redirects, tls, cookies, timings = packed
+    return url, {
+        'final_url': final_url,
+        'status_code': status_code,
+        'score': score,
+        'headers': headers,
+        'issues': [
+            {'severity': severity, 'category': category, 'message': message, 'recommendation': recommendation}
+            for severity, category, message, recommendation in issues
+        ],
+        'redirects': redirects,
+        'tls': tls,
+        'cookies': cookies,
+        'timings': timings,
+    }, None
+
+
+async def _scan_chunk_async(urls, concurrency, per_host):
+    hosts = {}
+    async with AsyncSecurityScanner(max_concurrency=concurrency) as scanner:
+        async def scan(url):
+            slot = hosts.setdefault(urlparse(url).hostname or '', asyncio.Semaphore(per_host))
+            async with slot:
+                try:
+                    return _pack(url, await scanner.scan_url(url), None)
+                except Exception as e:
+                    return _pack(url, None, str(e))
+
+        return await asyncio.gather(*(scan(url) for url in urls))
+
+
+def host_chunks(urls, chunk_size):
+    """
+    Split `urls` into chunks of about `chunk_size` with all the URLs of a
+    host in the same chunk, so that the per-host cap of the one process
+    scanning a chunk is the cap for the host. A host with more than
+    `chunk_size` URLs gets a larger chunk of its own.
+    """
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(urlparse(url).hostname or '', []).append(url)
+
+    chunks, chunk = [], []
+    for host_urls in by_host.values():
+        if chunk and len(chunk) + len(host_urls) > chunk_size:
+            chunks.append(chunk)
+            chunk = []
+        chunk += host_urls
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _scan_chunk(urls, concurrency, per_host):
+    """Runs in a worker process: scan one chunk of URLs on a fresh event loop"""
+    return asyncio.run(_scan_chunk_async(urls, concurrency, per_host))
+
+
+def rescore_chunk(items):
+    """
+    Runs in a worker process: re-score stored results without fetching.
+    `items` are (scan_id, final_url, headers, redirects, tls, cookies,
+    scanned_at, issues) tuples; returns (scan_id, score, issues) tuples in
+    the same order.
+    """
+    scanner = SecurityScanner()
+    results = []
+    for scan_id, final_url, headers, redirects, tls, cookies, scanned_at, issues in items:
+        result = scanner.rescore(final_url, headers, redirects=redirects, tls=tls, cookies=cookies, issues=issues,
+                                 scanned_at=scanned_at)
+        results.append((scan_id, result['score'], result['issues']))
+    return results
+
+
+class ProcessExecutor:
+    """
+    A pool of `processes` worker processes (one per core by default), each
+    scanning chunks of URLs with up to `concurrency_per_process` fetches in
+    flight on its own event loop. Processes are spawned fresh, so they do
+    not inherit database connections or threads from this one.
+    """
+
+    def __init__(self, processes=None, concurrency_per_process=50, per_host=2, chunk_size=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.concurrency_per_process = concurrency_per_process
+        self.per_host = per_host
+        # Enough work to keep a process's loop busy, small enough that results
+        # reach the writer steadily (a chunk's results arrive together)
+        self.chunk_size = chunk_size or concurrency_per_process * 2
+
+    def scan_many(self, urls):
+        chunks = host_chunks(urls, self.chunk_size)
+        if not chunks:
+            return
+
+        scan_chunk = partial(_scan_chunk, concurrency=self.concurrency_per_process, per_host=self.per_host)
+        context = multiprocessing.get_context('spawn')
+        processes = min(self.processes, len(chunks))
+        with context.Pool(processes, initializer=init_worker_process, initargs=(scanner_options(),)) as pool:
+            for packed_results in pool.imap_unordered(scan_chunk, chunks):
+                for packed in packed_results:
+                    yield _unpack(packed)
+
+
+EXECUTORS = {
+    'thread': ThreadExecutor,
+    'process': ProcessExecutor,
+}
+
+
+def make_executor(kind='thread', **options):
+    """Build the executor named `kind` ('thread' or 'process')"""
+    try:
+        executor_class = EXECUTORS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown scan executor '{kind}', expected one of {', '.join(EXECUTORS)}")
+    return executor_class(**options)
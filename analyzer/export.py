@@ -0,0 +1,156 @@
+"""
+Scan Export
+Streams scan history with its issues as CSV or NDJSON. Scans are read with a
+server-side iterator, `chunk_size` at a time with their issues prefetched per
+chunk, and each row is written out as soon as it is read, so memory use
+stays flat however many scans are exported.
+"""
+import csv
+import json
+from collections import OrderedDict
+from datetime import datetime, time
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .diffing import apply_diff
+from .models import Issue
+
+
+DEFAULT_CHUNK_SIZE = 2000
+
+SCAN_FIELDS = (
+    'id', 'url', 'final_url', 'status', 'status_code', 'score', 'high_count', 'medium_count', 'low_count',
+    'failure_reason', 'error', 'owner_id', 'batch_id', 'crawl_id', 'target_id', 'created_at', 'finished_at',
+)
+ISSUE_FIELDS = ('severity', 'category', 'message', 'recommendation')
+
+# One CSV row per issue, repeating the scan columns; scans without issues get one row
+CSV_COLUMNS = list(SCAN_FIELDS) + [f'issue_{field}' for field in ISSUE_FIELDS]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ChainIssues:
+    """
+    Issues of the latest exported scan of each monitoring chain, so a diff
+    scan is rebuilt from its predecessor in the export instead of from its
+    base snapshot. At most `max_chains` chains are remembered.
+    """
+
+    def __init__(self, max_chains=10000):
+        self.max_chains = max_chains
+        self._latest = OrderedDict()
+
+    def issues(self, scan):
+        if scan.diff is None:
+            issues = [{field: getattr(issue, field) for field in ISSUE_FIELDS} for issue in scan.issues.all()]
+            chain = scan.id
+        else:
+            chain = scan.base_id
+            latest = self._latest.get(chain)
+            if latest is not None and latest[0] == scan.previous_id:
+                _, issues = apply_diff({}, latest[1], scan.diff)
+            else:
+                _, issues = scan.materialize()
+
+        if scan.target_id is not None or scan.diff is not None:
+            self._latest[chain] = (scan.id, issues)
+            self._latest.move_to_end(chain)
+            if len(self._latest) > self.max_chains:
+                self._latest.popitem(last=False)
+        return issues
+
+
+def export_queryset(queryset):
+    """`queryset` of ScanResults narrowed to what an export reads, oldest first"""
+    return (
+        queryset.order_by('id')
+        .only(*[field for field in SCAN_FIELDS if not field.endswith('_id')],
+              'owner', 'batch', 'crawl', 'target', 'diff', 'previous', 'base')
+        .prefetch_related(Prefetch('issues', queryset=Issue.objects.order_by('id').only('scan_result', *ISSUE_FIELDS)))
+    )
+
+
+def iter_scans(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (scan dict, issue dicts) for every scan in `queryset`, in id order"""
+    chains = ChainIssues()
+    for scan in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        row = {field: getattr(scan, field) for field in SCAN_FIELDS}
+        for field in ('created_at', 'finished_at'):
+            row[field] = row[field].isoformat() if row[field] else None
+        yield row, chains.issues(scan)
+
+
+class _Echo:
+    """File-like object whose write() returns what was written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """CSV lines (str) of the scans in `queryset`, header first"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row, issues in iter_scans(queryset, chunk_size):
+        scan_columns = [row[field] for field in SCAN_FIELDS]
+        if not issues:
+            yield writer.writerow(scan_columns + [''] * len(ISSUE_FIELDS))
+        for issue in issues:
+            yield writer.writerow(scan_columns + [issue[field] for field in ISSUE_FIELDS])
+
+
+def iter_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """One JSON line per scan in `queryset`, with its issues nested"""
+    for row, issues in iter_scans(queryset, chunk_size):
+        row['issues'] = issues
+        yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+FORMATS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def iter_export(queryset, export_format='ndjson', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lines of `queryset` exported as `export_format` ('csv' or 'ndjson')"""
+    try:
+        iter_format = FORMATS[export_format]
+    except KeyError:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(FORMATS)}")
+    return iter_format(queryset, chunk_size)
+
+
+def filter_scans(queryset, since=None, until=None, after_id=None, status=None):
+    """Narrow an export to scans created in [since, until), after a scan id, or with a status"""
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def parse_when(value):
+    """
+    An ISO date or datetime from a query parameter or option, as an aware
+    datetime (dates mean midnight). Raises ValueError if it is neither.
+    """
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{value}' is not an ISO date or datetime")
+        when = datetime.combine(day, time.min)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
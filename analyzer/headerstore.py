@@ -0,0 +1,79 @@
+"""
+Header Set Store
+Response headers are split into a stable part, stored once per distinct set
+in HeaderSet (content-addressed by a hash of the normalized set), and a small
+volatile part (Date, cookies, validators, request ids) kept on the ScanResult.
+This module holds the pure helpers; interning lives in analyzer.services.
+"""
+import base64
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+
+
+# Headers that differ on nearly every response and would defeat deduplication
+VOLATILE_HEADERS = frozenset({
+    'age',
+    'cf-ray',
+    'content-length',
+    'date',
+    'etag',
+    'expires',
+    'last-modified',
+    'request-id',
+    'server-timing',
+    'set-cookie',
+    'traceparent',
+    'x-amz-cf-id',
+    'x-amz-request-id',
+    'x-cache',
+    'x-cache-hits',
+    'x-request-id',
+    'x-runtime',
+    'x-served-by',
+    'x-timer',
+    'x-trace-id',
+})
+
+
+def split_headers(headers):
+    """Return (stable, volatile) header dicts"""
+    stable = {}
+    volatile = {}
+    for name, value in headers.items():
+        if name.lower() in VOLATILE_HEADERS:
+            volatile[name] = value
+        else:
+            stable[name] = value
+    return stable, volatile
+
+
+def header_digest(headers):
+    """SHA-256 of the set with lowercased names, independent of order"""
+    normalized = sorted((name.lower(), value) for name, value in headers.items())
+    return hashlib.sha256(json.dumps(normalized, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def encode_headers(headers):
+    """Replace large values (e.g. long CSPs) with {'z': base64 zlib data} when that is smaller"""
+    threshold = getattr(settings, 'HEADER_SET_COMPRESS_MIN_BYTES', 512)
+    encoded = {}
+    for name, value in headers.items():
+        if threshold and isinstance(value, str) and len(value) >= threshold:
+            packed = base64.b64encode(zlib.compress(value.encode('utf-8'), 9)).decode('ascii')
+            if len(packed) < len(value):
+                encoded[name] = {'z': packed}
+                continue
+        encoded[name] = value
+    return encoded
+
+
+def decode_headers(encoded):
+    headers = {}
+    for name, value in encoded.items():
+        if isinstance(value, dict) and 'z' in value:
+            value = zlib.decompress(base64.b64decode(value['z'])).decode('utf-8')
+        headers[name] = value
+    return headers
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.monitoring import add_target
+from analyzer.scanner import normalize_url
+
+
+class Command(BaseCommand):
+    help = 'Register a URL for continuous monitoring'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--interval', type=int, default=1440,
+                            help='Minutes between rescans (default: one day)')
+        parser.add_argument('--owner', help='Username to record as the owner of the scans')
+
+    def handle(self, *args, **options):
+        if options['interval'] < 1:
+            raise CommandError('--interval must be at least one minute')
+
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist")
+
+        target = add_target(
+            normalize_url(options['url']),
+            interval=timedelta(minutes=options['interval']),
+            owner=owner,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Monitoring {target.url} every {target.interval}, first scan at {target.next_scan_at:%Y-%m-%d %H:%M:%S}'
+        ))
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.batch import CrawlRunner
+from analyzer.models import SiteCrawl
+from analyzer.scanner import normalize_url
+
+
+class Command(BaseCommand):
+    help = 'Crawl a site from a start URL, scanning each same-origin page, and store the rolled-up result'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Start URL')
+        parser.add_argument('--max-pages', type=int, default=getattr(settings, 'CRAWL_MAX_PAGES', 100),
+                            help='Maximum number of pages to scan')
+        parser.add_argument('--max-depth', type=int, default=getattr(settings, 'CRAWL_MAX_DEPTH', 3),
+                            help='Maximum number of links away from the start URL')
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'CRAWL_CONCURRENCY', 8),
+                            help='Pages in flight at once')
+        parser.add_argument('--rate', type=float, default=getattr(settings, 'CRAWL_RATE_PER_HOST', 50),
+                            help='Requests per second per host, 0 for no limit')
+        parser.add_argument('--owner', help='Username to record as the owner of the crawl')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist")
+
+        url = normalize_url(options['url'])
+        if not url:
+            raise CommandError('No URL to crawl')
+
+        crawl = SiteCrawl.objects.create(
+            url=url,
+            owner=owner,
+            max_pages=options['max_pages'],
+            max_depth=options['max_depth'],
+        )
+        self.stdout.write(f'Crawl {crawl.id}: {url}')
+
+        started = time.monotonic()
+        runner = CrawlRunner(
+            concurrency=options['concurrency'],
+            rate_per_host=options['rate'],
+            max_body_bytes=getattr(settings, 'CRAWL_MAX_BODY_BYTES', 512 * 1024),
+        )
+        runner.run(crawl)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f'{crawl.pages_scanned} pages scanned, {crawl.pages_failed} failed in {elapsed:.1f}s'
+        )
+        for issue in crawl.issues:
+            self.stdout.write(f"  [{issue['severity']}] {issue['message']} ({issue['pages']} pages)")
+        if crawl.status == 'done':
+            self.stdout.write(self.style.SUCCESS(
+                f'Site score {crawl.score} (average page score {crawl.average_score})'
+            ))
+        else:
+            self.stdout.write(self.style.ERROR('No page could be scanned'))
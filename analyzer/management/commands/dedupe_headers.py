@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analyzer.models import HeaderSet, ScanResult
+from analyzer.services import store_headers
+
+
+class Command(BaseCommand):
+    help = 'Move the raw_headers of existing scans into shared, deduplicated header sets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Scans converted per transaction')
+
+    def handle(self, *args, **options):
+        last_id = 0
+        converted = 0
+        bytes_before = 0
+        bytes_after = 0
+
+        while True:
+            chunk = list(
+                ScanResult.objects.filter(id__gt=last_id, header_set__isnull=True, diff__isnull=True)
+                .exclude(raw_headers={})
+                .order_by('id')
+                .only('id', 'raw_headers')[:options['batch_size']]
+            )
+            if not chunk:
+                break
+
+            bytes_before += sum(len(json.dumps(scan.raw_headers)) for scan in chunk)
+            with transaction.atomic():
+                store_headers(chunk, [scan.raw_headers for scan in chunk])
+                ScanResult.objects.bulk_update(chunk, ['header_set', 'raw_headers'])
+            bytes_after += sum(len(json.dumps(scan.raw_headers)) for scan in chunk)
+
+            converted += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'  {converted} scans converted')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Converted {converted} scans; {HeaderSet.objects.count()} distinct header sets stored. '
+            f'Per-scan header data went from {bytes_before} to {bytes_after} bytes.'
+        ))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.export import FORMATS, filter_scans, iter_export, parse_when
+from analyzer.models import ScanResult
+
+
+class Command(BaseCommand):
+    help = 'Stream scans and their issues as CSV or NDJSON, oldest first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson',
+                            help='Output format: one row per issue (csv) or one line per scan (ndjson)')
+        parser.add_argument('--output', help='File to write to instead of standard output')
+        parser.add_argument('--owner', help='Only export scans owned by this username')
+        parser.add_argument('--since', help='Only scans created at or after this ISO date or datetime')
+        parser.add_argument('--until', help='Only scans created before this ISO date or datetime')
+        parser.add_argument('--after-id', type=int, help='Only scans with a higher id, to resume an export')
+        parser.add_argument('--status', choices=[choice for choice, label in ScanResult.STATUS_CHOICES],
+                            help='Only scans with this status')
+        parser.add_argument('--chunk-size', type=int, default=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000),
+                            help='Scans read per database round trip')
+
+    def handle(self, *args, **options):
+        queryset = ScanResult.objects.all()
+        if options['owner']:
+            try:
+                queryset = queryset.filter(owner=User.objects.get(username=options['owner']))
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist")
+
+        try:
+            since = parse_when(options['since']) if options['since'] else None
+            until = parse_when(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        queryset = filter_scans(queryset, since=since, until=until, after_id=options['after_id'],
+                                status=options['status'])
+
+        lines = iter_export(queryset, options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                count = self._write(lines, output)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {count} lines to {options['output']}"))
+        else:
+            self._write(lines, self.stdout)
+
+    def _write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analyzer.retention import Archiver
+
+
+class Command(BaseCommand):
+    help = 'Move finished scans past the retention limits out of the database into the monthly archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'RETENTION_BATCH_SIZE', 500),
+                            help='Scans archived per file write and transaction')
+        parser.add_argument('--archive-dir', help='Directory of the archive files (default: SCAN_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the scans past each limit, archive nothing')
+
+    def handle(self, *args, **options):
+        archiver = Archiver(directory=options['archive_dir'], batch_size=options['batch_size'],
+                            dry_run=options['dry_run'])
+        started = time.monotonic()
+        archived = archiver.prune(on_batch=lambda archived: self.stdout.write(f'  {archived} scans archived'))
+
+        for limit, scans in archived.items():
+            self.stdout.write(f'  past the {limit} limit: {scans}')
+        if options['dry_run']:
+            # A scan past several limits is counted for each of them
+            self.stdout.write(self.style.SUCCESS(f'Would archive up to {sum(archived.values())} scans'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {sum(archived.values())} scans to {archiver.directory} '
+                f'in {time.monotonic() - started:.1f}s'
+            ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.rollups import DEFAULT_REBUILD_CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard rollup tables from the stored scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_REBUILD_CHUNK_SIZE,
+                            help='Scans read and counted per step')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        scanned = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rollups from {scanned} scans in {time.monotonic() - started:.1f}s'
+        ))
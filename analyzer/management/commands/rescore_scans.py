@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.export import parse_when
+from analyzer.models import RescoreRun
+from analyzer.rescoring import Rescorer
+
+
+class Command(BaseCommand):
+    help = 'Re-score stored scans with the current rules and weights, without fetching them again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'RESCORE_PROCESSES', None),
+                            help='Worker processes running the checks (default: one per core)')
+        parser.add_argument('--chunk-size', type=int, default=getattr(settings, 'RESCORE_CHUNK_SIZE', 1000),
+                            help='Scans read and written per step')
+        parser.add_argument('--since', help='Only scans created at or after this ISO date or datetime')
+        parser.add_argument('--until', help='Only scans created before this ISO date or datetime')
+        parser.add_argument('--dry-run', action='store_true', help='Count the scans that would change, write nothing')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_when(options['since']) if options['since'] else None
+            until = parse_when(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rescore_run = RescoreRun.objects.create(since=since, until=until, dry_run=options['dry_run'])
+        started = time.monotonic()
+        rescorer = Rescorer(processes=options['processes'], chunk_size=options['chunk_size'],
+                            dry_run=options['dry_run'])
+        rescore_run = rescorer.run(rescore_run)
+        if rescore_run.status == 'failed':
+            raise CommandError(f'Re-scoring failed after {rescore_run.processed} scans: {rescore_run.error}')
+
+        verb = 'Would change' if rescore_run.dry_run else 'Changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-scored {rescore_run.processed} scans in {time.monotonic() - started:.1f}s; '
+            f'{verb} {rescore_run.changed}'
+        ))
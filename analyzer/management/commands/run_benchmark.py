@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from analyzer import benchmark
+from analyzer.stubserver import StubConfig, StubServer
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the scanner and views against a local stub HTTP server, and concurrent writes to the '
+            'configured database, and write a JSON report')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--out', default='benchmark.json', help='Where to write the JSON report')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+        parser.add_argument('--levels', default='1,4,16,64',
+                            help='Comma-separated scanner concurrency levels')
+        parser.add_argument('--scans', type=int, default=200, help='Scans per concurrency level')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per view')
+        parser.add_argument('--latency', type=float, default=0.01, help='Stub server latency in seconds')
+        parser.add_argument('--redirects', type=int, default=1, help='Redirects before the final page')
+        parser.add_argument('--body-size', type=int, default=64 * 1024, help='Final page body size in bytes')
+        parser.add_argument('--cookies', type=int, default=3, help='Cookies set by the final page')
+        parser.add_argument('--skip-views', action='store_true', help='Do not benchmark the views')
+        parser.add_argument('--db-levels', default='1,4,16',
+                            help='Comma-separated numbers of threads writing to the database at once')
+        parser.add_argument('--db-writes', type=int, default=500, help='Scan results stored per database level')
+        parser.add_argument('--write-batch-size', type=int, default=max(getattr(settings, 'SCAN_WRITE_BATCH_SIZE', 1), 2),
+                            help='Results per transaction when writes are batched')
+        parser.add_argument('--skip-db', action='store_true', help='Do not benchmark database writes')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['levels'].split(',')]
+            db_levels = [int(level) for level in options['db_levels'].split(',')]
+        except ValueError:
+            raise CommandError('--levels and --db-levels must be comma-separated lists of integers')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        config = StubConfig(
+            cookies=[f'c{i}=v; Path=/; HttpOnly' for i in range(options['cookies'])],
+            redirects=options['redirects'],
+            body_size=options['body_size'],
+            latency=options['latency'],
+        )
+        report = {'environment': benchmark.environment(), 'config': {
+            key: options[key] for key in (
+                'levels', 'scans', 'requests', 'latency', 'redirects', 'body_size', 'cookies',
+                'db_levels', 'db_writes', 'write_batch_size',
+            )
+        }}
+
+        with StubServer(config) as server:
+            self.stdout.write(f'Stub server on {server.url}')
+            report['scanner'] = benchmark.bench_scanner(server.url, levels, options['scans'])
+            report['scanner'] += benchmark.bench_async_scanner(server.url, levels, options['scans'])
+            for run in report['scanner']:
+                self.stdout.write(
+                    f"  {run['engine']:5} c={run['concurrency']:<4} {run['per_sec']:>9} scans/s  "
+                    f"p50 {run['p50_ms']} ms  p95 {run['p95_ms']} ms  p99 {run['p99_ms']} ms"
+                )
+
+            if not options['skip_views']:
+                report['views'] = self._bench_views(server.url, options['requests'])
+                for name, view in report['views'].items():
+                    self.stdout.write(
+                        f"  {name:9} p50 {view['p50_ms']} ms  p95 {view['p95_ms']} ms  "
+                        f"{view['queries_per_request']} queries/request"
+                    )
+
+        if not options['skip_db']:
+            report['db_writes'] = self._bench_db_writes(db_levels, options['db_writes'], options['write_batch_size'])
+            for run in report['db_writes']:
+                self.stdout.write(
+                    f"  db {run['mode']:7} c={run['concurrency']:<4} {run['per_sec']:>9} writes/s  "
+                    f"p50 {run['p50_ms']} ms  p95 {run['p95_ms']} ms  {run['failures']} failed"
+                )
+
+        report['peak_rss_kb'] = benchmark.peak_rss_kb()
+        self.stdout.write(f"  peak RSS {report['peak_rss_kb']} KiB")
+
+        with open(options['out'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['out']}"))
+
+        if baseline:
+            self.stdout.write(f"Compared with {options['compare']}:")
+            for line in benchmark.compare(report, baseline):
+                self.stdout.write(f'  {line}')
+
+    def _bench_views(self, url, requests):
+        """Run the view benchmark against a throwaway test database"""
+        return self._on_test_db(benchmark.bench_views, url, requests)
+
+    def _bench_db_writes(self, levels, writes, batch_size):
+        """
+        Run the write benchmark against a throwaway test database. SQLite
+        test databases live in memory by default, so this one is put on disk
+        where the SQLITE_PRAGMAS (WAL, synchronous) apply.
+        """
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            try:
+                return self._on_test_db(benchmark.bench_db_writes, levels, writes, batch_size)
+            finally:
+                test_settings['NAME'] = old_test_name
+
+    def _on_test_db(self, func, *args):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            return func(*args)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
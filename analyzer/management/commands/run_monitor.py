@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.monitoring import schedule_due_scans
+
+
+class Command(BaseCommand):
+    help = 'Enqueue scans for monitored targets as they come due (run alongside run_scan_worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, default=30.0,
+                            help='Seconds between scheduling rounds')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum number of scans to enqueue per round')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single scheduling round and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            enqueued = schedule_due_scans(limit=options['limit'])
+            if enqueued:
+                self.stdout.write(f'Enqueued {enqueued} monitoring scans')
+            if options['once']:
+                return
+            try:
+                time.sleep(options['tick'])
+            except KeyboardInterrupt:
+                return
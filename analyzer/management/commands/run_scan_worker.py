@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analyzer import metrics
+from analyzer.worker import ScanWorker
+
+
+class Command(BaseCommand):
+    help = 'Run queued scans from the database until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'SCAN_WORKER_CONCURRENCY', 4),
+                            help='Number of scans to run in parallel')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Requeue jobs that have been running for longer than this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty')
+        parser.add_argument('--write-batch-size', type=int, default=getattr(settings, 'SCAN_WRITE_BATCH_SIZE', 1),
+                            help='Results stored per transaction by a single writer thread, 1 to write from every thread')
+        parser.add_argument('--metrics-port', type=int, default=getattr(settings, 'SCAN_WORKER_METRICS_PORT', None),
+                            help='Serve Prometheus metrics for this worker on this port')
+        parser.add_argument('--metrics-addr', default=getattr(settings, 'SCAN_WORKER_METRICS_ADDR', '127.0.0.1'),
+                            help='Address to serve metrics on (default: local connections only)')
+
+    def handle(self, *args, **options):
+        worker = ScanWorker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            stale_after=timedelta(seconds=options['stale_after']),
+            write_batch_size=options['write_batch_size'],
+        )
+        if options['metrics_port']:
+            metrics.start_http_server(options['metrics_port'], addr=options['metrics_addr'],
+                                      token=getattr(settings, 'METRICS_TOKEN', None))
+            self.stdout.write(f"Serving metrics on {options['metrics_addr']}:{options['metrics_port']}")
+        self.stdout.write(f"Scan worker started with {options['concurrency']} threads")
+        worker.run(exit_when_idle=options['once'])
+        self.stdout.write(self.style.SUCCESS('Scan worker stopped'))
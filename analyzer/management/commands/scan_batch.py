@@ -0,0 +1,84 @@
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.batch import BatchRunner, parse_url_list
+from analyzer.executors import EXECUTORS, make_executor
+from analyzer.models import ScanBatch
+from analyzer.transport import get_transport
+
+
+class Command(BaseCommand):
+    help = 'Scan a list of URLs (one per line) concurrently and store the results as a batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with one URL per line, or "-" to read from stdin')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'SCAN_BATCH_WORKERS', 16),
+                            help='Maximum number of scans in flight')
+        parser.add_argument('--per-host', type=int, default=getattr(settings, 'SCAN_BATCH_PER_HOST', 2),
+                            help='Maximum number of concurrent scans against a single host')
+        parser.add_argument('--executor', choices=sorted(EXECUTORS), default=getattr(settings, 'SCAN_EXECUTOR', 'thread'),
+                            help='Scan on threads in this process, or on one worker process per core')
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'SCAN_PROCESSES', None),
+                            help='Worker processes for --executor process (default: number of cores)')
+        parser.add_argument('--per-process', type=int, default=getattr(settings, 'SCAN_CONCURRENCY_PER_PROCESS', 50),
+                            help='Scans in flight in each worker process')
+        parser.add_argument('--owner', help='Username to record as the owner of the scans')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist")
+
+        if options['path'] == '-':
+            urls = parse_url_list(sys.stdin)
+        else:
+            try:
+                with open(options['path'], encoding='utf-8') as f:
+                    urls = parse_url_list(f)
+            except OSError as e:
+                raise CommandError(str(e))
+
+        if not urls:
+            raise CommandError('No URLs to scan')
+
+        batch = ScanBatch.objects.create(owner=owner, total=len(urls))
+        self.stdout.write(f'Batch {batch.id}: scanning {len(urls)} URLs')
+
+        step = max(len(urls) // 20, 1)
+
+        def on_progress(batch):
+            done = batch.completed + batch.failed
+            if done % step == 0 or done == batch.total:
+                self.stdout.write(f'  {done}/{batch.total} ({batch.failed} failed)')
+
+        if options['executor'] == 'process':
+            executor = make_executor(
+                'process',
+                processes=options['processes'],
+                concurrency_per_process=options['per_process'],
+                per_host=options['per_host'],
+            )
+            self.stdout.write(f'Using {executor.processes} worker processes, {options["per_process"]} scans each')
+        else:
+            executor = make_executor('thread', max_workers=options['workers'], per_host=options['per_host'])
+        runner = BatchRunner(executor=executor)
+        runner.run(batch, urls, on_progress=on_progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Batch {batch.id} finished: {batch.completed} scanned, {batch.failed} failed'
+        ))
+
+        if options['executor'] == 'process':
+            return  # connections were made in the worker processes
+        stats = get_transport().snapshot()
+        self.stdout.write(
+            f"Connections: {stats['requests']} requests over {stats['connections_opened']} new connections "
+            f"({stats['reuse_ratio']:.0%} reused), DNS cache {stats['dns_cache']['hits']} hits / "
+            f"{stats['dns_cache']['misses']} misses"
+        )
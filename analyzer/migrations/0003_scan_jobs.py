@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_scanbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Scans stored before the job queue existed are complete
+        migrations.AddField(
+            model_name='scanresult',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='scanresult',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='scanresult',
+            name='final_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='scanresult',
+            name='status_code',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_scan_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='scan_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=models.Index(fields=['-created_at', '-id'], name='scan_created_idx'),
+        ),
+    ]
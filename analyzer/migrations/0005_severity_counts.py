@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_severity_counts(apps, schema_editor):
+    ScanResult = apps.get_model('analyzer', 'ScanResult')
+    Issue = apps.get_model('analyzer', 'Issue')
+
+    for severity in ('high', 'medium', 'low'):
+        counts = (
+            Issue.objects.filter(scan_result=OuterRef('pk'), severity=severity)
+            .order_by()
+            .values('scan_result')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        ScanResult.objects.update(**{f'{severity}_count': Coalesce(Subquery(counts), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_scan_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='issue',
+            options={},
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='high_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='low_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='medium_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_severity_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:22
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analyzer', '0005_severity_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='diffs', to='analyzer.scanresult'),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='diff',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='previous',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='analyzer.scanresult'),
+        ),
+        migrations.CreateModel(
+            name='MonitoredTarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('interval', models.DurationField(default=datetime.timedelta(days=1))),
+                ('next_scan_at', models.DateTimeField(db_index=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_scan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='analyzer.scanresult')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['url'],
+            },
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='target',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scans', to='analyzer.monitoredtarget'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0007_header_sets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='failure_reason',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analyzer', '0008_scan_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCrawl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('max_pages', models.PositiveIntegerField(default=100)),
+                ('max_depth', models.PositiveIntegerField(default=3)),
+                ('pages_scanned', models.PositiveIntegerField(default=0)),
+                ('pages_failed', models.PositiveIntegerField(default=0)),
+                ('score', models.IntegerField(blank=True, null=True)),
+                ('average_score', models.FloatField(blank=True, null=True)),
+                ('issues', models.JSONField(blank=True, default=list)),
+                ('errors', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='scanresult',
+            name='crawl',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='analyzer.sitecrawl'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0009_site_crawls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='redirect_chain',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
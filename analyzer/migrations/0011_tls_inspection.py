@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0010_redirect_chain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='tls',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
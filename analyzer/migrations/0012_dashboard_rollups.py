@@ -0,0 +1,116 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:55
+
+from django.db import migrations, models
+from django.db.models import F
+
+from analyzer.diffing import apply_diff
+from analyzer.rollups import RollupBatch
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Count the scans already stored. Rows from before finished_at was
+    recorded get their creation time, so they count on the right day.
+    """
+    ScanResult = apps.get_model('analyzer', 'ScanResult')
+    Issue = apps.get_model('analyzer', 'Issue')
+    ScanResult.objects.filter(status__in=('done', 'failed'), finished_at__isnull=True).update(
+        finished_at=F('created_at'),
+    )
+
+    fields = ('severity', 'category', 'message', 'recommendation')
+    chains = {}  # issues of the latest scan of each monitoring chain, by base id
+    last_id = 0
+    while True:
+        scans = list(ScanResult.objects.filter(status='done', id__gt=last_id).order_by('id')[:2000])
+        if not scans:
+            break
+        last_id = scans[-1].id
+        stored = {}
+        for issue in Issue.objects.filter(scan_result__in=[scan for scan in scans if scan.diff is None]).order_by('id'):
+            stored.setdefault(issue.scan_result_id, []).append({field: getattr(issue, field) for field in fields})
+
+        batch = RollupBatch()
+        for scan in scans:
+            if scan.diff is None:
+                issues = stored.get(scan.id, [])
+                if scan.target_id is not None:
+                    chains[scan.id] = issues
+            else:
+                # Scans come in id order, so a diff's predecessor is the chain's latest
+                _, issues = apply_diff({}, chains.get(scan.base_id, []), scan.diff)
+                chains[scan.base_id] = issues
+            batch.add(scan, issues)
+        batch.save(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0011_tls_inspection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDomainStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('scans', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+                ('high_count', models.PositiveIntegerField(default=0)),
+                ('medium_count', models.PositiveIntegerField(default=0)),
+                ('low_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyIssueStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('severity', models.CharField(max_length=10)),
+                ('category', models.CharField(max_length=100)),
+                ('message', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('scans', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyIssueStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('severity', models.CharField(max_length=10)),
+                ('category', models.CharField(max_length=100)),
+                ('message', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyissuestats',
+            constraint=models.UniqueConstraint(fields=('month', 'severity', 'category', 'message'), name='rollup_issue_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyscorebucket',
+            constraint=models.UniqueConstraint(fields=('day', 'bucket'), name='rollup_score_day_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyissuestats',
+            constraint=models.UniqueConstraint(fields=('day', 'severity', 'category', 'message'), name='rollup_issue_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailydomainstats',
+            constraint=models.UniqueConstraint(fields=('domain', 'day'), name='rollup_domain_day'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0013_rescore_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='cookies',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,22 +1,283 @@
+from datetime import timedelta
+from functools import cached_property
+
 from django.db import models
 from django.contrib.auth.models import User
 
+from .diffing import apply_diff
+from .headerstore import decode_headers
+
+
+class ScanBatch(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch {self.id} - {self.completed + self.failed}/{self.total}"
+
+    @property
+    def progress(self):
+        """Fraction of URLs processed, between 0 and 1"""
+        if not self.total:
+            return 1.0
+        return (self.completed + self.failed) / self.total
+
+
+class RescoreRun(models.Model):
+    """An offline re-scoring of stored scans (see analyzer.rescoring)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    dry_run = models.BooleanField(default=False)
+    # Only scans created in [since, until) when set
+    since = models.DateTimeField(null=True, blank=True)
+    until = models.DateTimeField(null=True, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Rescore {self.id} - {self.processed}/{self.total}"
+
+
+class RetentionPolicy(models.Model):
+    """
+    Retention limits of one owner's scans, in place of the RETENTION_*
+    defaults (see analyzer.retention). An empty limit means none.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name='retention_policy')
+    max_age = models.DurationField(null=True, blank=True)
+    max_scans = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'retention policies'
+
+    def __str__(self):
+        return f"Retention of {self.owner}"
+
+
+class ArchivedScan(models.Model):
+    """
+    Where a scan moved out of the database by analyzer.retention is kept:
+    one gzip member of an archive file, holding the scan as a JSON line
+    """
+    scan_id = models.PositiveBigIntegerField(unique=True)  # the ScanResult's id
+    url = models.URLField(max_length=500)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10)
+    score = models.IntegerField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Absolute path of the archive file, and the byte range of the member
+    path = models.CharField(max_length=255)
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['owner', '-created_at'], name='archived_owner_created_idx')]
+
+    def __str__(self):
+        return f"{self.url} (archived scan {self.scan_id})"
+
+
+class HeaderSet(models.Model):
+    """A distinct set of stable response headers, shared by every scan that saw it"""
+    digest = models.CharField(max_length=64, unique=True)
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest[:12]
+
+    def decoded(self):
+        return decode_headers(self.headers)
+
+
+class MonitoredTarget(models.Model):
+    url = models.URLField(max_length=500)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    interval = models.DurationField(default=timedelta(days=1))
+    next_scan_at = models.DateTimeField(db_index=True)
+    last_scan = models.ForeignKey('ScanResult', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['url']
+
+    def __str__(self):
+        return f"{self.url} every {self.interval}"
+
+
+class SiteCrawl(models.Model):
+    """A multi-page scan of one site; its pages are ScanResults"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    url = models.URLField(max_length=500)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    max_pages = models.PositiveIntegerField(default=100)
+    max_depth = models.PositiveIntegerField(default=3)
+    pages_scanned = models.PositiveIntegerField(default=0)
+    pages_failed = models.PositiveIntegerField(default=0)
+    # Rolled up from the pages (see analyzer.crawler.rollup): the weakest
+    # page's score, and each distinct issue with the number of pages it is on
+    score = models.IntegerField(null=True, blank=True)
+    average_score = models.FloatField(null=True, blank=True)
+    issues = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Crawl of {self.url} - {self.pages_scanned} pages"
+
 
 class ScanResult(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
     url = models.URLField(max_length=500)
-    final_url = models.URLField(max_length=500)
-    status_code = models.IntegerField()
+    final_url = models.URLField(max_length=500, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
     score = models.IntegerField(default=100)
+    # Volatile headers only when header_set is set (see analyzer.headerstore)
     raw_headers = models.JSONField(default=dict)
+    header_set = models.ForeignKey(HeaderSet, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    batch = models.ForeignKey(ScanBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='results')
+    crawl = models.ForeignKey(SiteCrawl, on_delete=models.CASCADE, null=True, blank=True, related_name='pages')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    error = models.TextField(blank=True)
+    # Short cause of a failed scan (dns, connect, tls, timeout, ...), see analyzer.scanner.ScanError
+    failure_reason = models.CharField(max_length=20, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Milliseconds spent in each phase: dns, connect, tls, fetch, redirect, analysis, db_write
+    timings = models.JSONField(default=dict, blank=True)
+    # One dict per redirect hop before final_url (see analyzer.scanner.Hop.to_dict)
+    redirect_chain = models.JSONField(default=list, blank=True)
+    # Certificate and protocol of the final connection (see analyzer.tls.TLSInfo.to_dict)
+    tls = models.JSONField(null=True, blank=True)
+    # Cookies set by the final response (see analyzer.cookies.SetCookie.to_dict);
+    # None for scans stored before cookies were recorded
+    cookies = models.JSONField(null=True, blank=True)
+    # Issue counts per severity, written together with the issues
+    high_count = models.PositiveIntegerField(default=0)
+    medium_count = models.PositiveIntegerField(default=0)
+    low_count = models.PositiveIntegerField(default=0)
+    # Monitoring rescans store only a diff against the previous scan of the
+    # target; `base` is the last full snapshot of the chain
+    target = models.ForeignKey(MonitoredTarget, on_delete=models.SET_NULL, null=True, blank=True, related_name='scans')
+    previous = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    base = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='diffs')
+    diff = models.JSONField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of history and my_scans on (created_at, id)
+            models.Index(fields=['owner', '-created_at', '-id'], name='scan_owner_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='scan_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.url} - Score: {self.score}"
 
+    @property
+    def in_progress(self):
+        return self.status in ('pending', 'running')
+
+    @property
+    def issue_count(self):
+        return self.high_count + self.medium_count + self.low_count
+
+    @property
+    def is_diff(self):
+        return self.diff is not None
+
+    @cached_property
+    def headers(self):
+        """Full stored response headers: the shared header set plus the volatile ones"""
+        if self.header_set_id is None:
+            return dict(self.raw_headers)
+        headers = self.header_set.decoded()
+        headers.update(self.raw_headers)
+        return headers
+
+    def materialize(self):
+        """
+        Return (headers, issues) for this scan, with issues as dicts.
+        Diff scans are rebuilt from their base snapshot in two queries.
+        """
+        if self.diff is None:
+            return self.headers, _issue_dicts(self.issues.all())
+
+        chain = {
+            scan.id: scan
+            for scan in ScanResult.objects.select_related('header_set').filter(
+                models.Q(id=self.base_id) | models.Q(base_id=self.base_id, id__lt=self.id)
+            )
+        }
+        diffs = []
+        scan = self
+        while scan is not None and scan.diff is not None:
+            diffs.append(scan.diff)
+            scan = chain.get(scan.previous_id)
+
+        if scan is None:
+            headers, issues = {}, []  # the chain was broken by a deleted scan
+        else:
+            headers, issues = scan.headers, _issue_dicts(scan.issues.all())
+        for diff in reversed(diffs):
+            headers, issues = apply_diff(headers, issues, diff)
+        return headers, issues
+
+
+def _issue_dicts(issues):
+    return list(issues.order_by('id').values('severity', 'category', 'message', 'recommendation'))
+
 
 class Issue(models.Model):
     SEVERITY_CHOICES = [
@@ -32,10 +293,72 @@ class Issue(models.Model):
     recommendation = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def __str__(self):
+        return f"{self.severity.upper()}: {self.category}"
+
+
+# Dashboard rollups, maintained by analyzer.rollups as scans are stored
+
+class DailyScoreBucket(models.Model):
+    """Scans finished on a day with a score in [bucket, bucket + 10)"""
+    day = models.DateField()
+    bucket = models.PositiveSmallIntegerField()
+    scans = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+
     class Meta:
-        ordering = ['severity', '-created_at']
+        constraints = [models.UniqueConstraint(fields=['day', 'bucket'], name='rollup_score_day_bucket')]
 
     def __str__(self):
-        return f"{self.severity.upper()}: {self.category}"
+        return f"{self.day} {self.bucket}-{self.bucket + 9}: {self.scans}"
+
+
+class DailyDomainStats(models.Model):
+    """Scans of one domain finished on a day, with their summed score and issue counts"""
+    domain = models.CharField(max_length=255)
+    day = models.DateField()
+    scans = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+    high_count = models.PositiveIntegerField(default=0)
+    medium_count = models.PositiveIntegerField(default=0)
+    low_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['domain', 'day'], name='rollup_domain_day')]
+
+    def __str__(self):
+        return f"{self.domain} {self.day}: {self.scans}"
 
 
+class DailyIssueStats(models.Model):
+    """How often an issue (e.g. a missing header) was found on a day"""
+    day = models.DateField()
+    severity = models.CharField(max_length=10)
+    category = models.CharField(max_length=100)
+    message = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'severity', 'category', 'message'], name='rollup_issue_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.message}: {self.count}"
+
+
+class MonthlyIssueStats(models.Model):
+    """DailyIssueStats summed per month, so long dashboard windows read a row per month"""
+    month = models.DateField()  # first day of the month
+    severity = models.CharField(max_length=10)
+    category = models.CharField(max_length=100)
+    message = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'severity', 'category', 'message'], name='rollup_issue_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.message}: {self.count}"
@@ -0,0 +1,103 @@
+"""
+Continuous Monitoring
+Schedules periodic rescans of MonitoredTargets and stores each rescan as a
+diff against the previous scan of the same target
+"""
+import math
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .diffing import diff_scans
+from .models import MonitoredTarget, ScanResult
+from .services import complete_scan_result
+
+
+def initial_scan_time(url, interval, now=None):
+    """
+    First scan time for a new target. Each URL gets a stable phase within
+    its interval, so targets added together are spread out instead of all
+    coming due at the same moment.
+    """
+    now = now or timezone.now()
+    seconds = max(int(interval.total_seconds()), 1)
+    return now + timedelta(seconds=zlib.crc32(url.encode('utf-8')) % seconds)
+
+
+def next_scan_time(target, now):
+    """Advance by whole intervals, keeping the target's phase even after downtime"""
+    next_at = target.next_scan_at + target.interval
+    if next_at <= now:
+        missed = math.floor((now - next_at) / target.interval) + 1
+        next_at += target.interval * missed
+    return next_at
+
+
+def add_target(url, interval=timedelta(days=1), owner=None):
+    return MonitoredTarget.objects.create(
+        url=url,
+        owner=owner,
+        interval=interval,
+        next_scan_at=initial_scan_time(url, interval),
+    )
+
+
+def schedule_due_scans(now=None, limit=None):
+    """
+    Enqueue a scan job for every due target, at most `limit` per call.
+    Targets whose previous job has not finished yet are skipped for this
+    round. Returns the number of jobs enqueued.
+    """
+    now = now or timezone.now()
+    if limit is None:
+        limit = getattr(settings, 'MONITOR_MAX_PER_TICK', 100)
+
+    due = list(
+        MonitoredTarget.objects.filter(is_active=True, next_scan_at__lte=now)
+        .order_by('next_scan_at')[:limit]
+    )
+    busy = set(
+        ScanResult.objects.filter(target__in=due, status__in=('pending', 'running'))
+        .values_list('target_id', flat=True)
+    )
+
+    enqueued = 0
+    for target in due:
+        if target.id not in busy:
+            ScanResult.objects.create(url=target.url, owner=target.owner, target=target, status='pending')
+            enqueued += 1
+        target.next_scan_at = next_scan_time(target, now)
+        target.save(update_fields=['next_scan_at'])
+    return enqueued
+
+
+def _needs_snapshot(previous):
+    """Start a new full snapshot every MONITOR_SNAPSHOT_EVERY scans to bound diff chains"""
+    if previous.diff is None:
+        depth = 0
+    else:
+        depth = ScanResult.objects.filter(base_id=previous.base_id).count()
+    return depth + 1 >= getattr(settings, 'MONITOR_SNAPSHOT_EVERY', 20)
+
+
+def complete_monitored_scan(job, result_data):
+    """Store a monitoring rescan as a diff against the target's last scan"""
+    target = job.target
+    previous = target.last_scan
+    if previous is not None and previous.status != 'done':
+        previous = None
+
+    if previous is None or _needs_snapshot(previous):
+        complete_scan_result(job, result_data)
+    else:
+        old_headers, old_issues = previous.materialize()
+        diff = diff_scans(
+            old_headers, old_issues, previous.score,
+            result_data['headers'], result_data['issues'], result_data['score'],
+        )
+        complete_scan_result(job, result_data, previous=previous, diff=diff)
+
+    MonitoredTarget.objects.filter(id=target.id).update(last_scan=job)
+    return job
@@ -0,0 +1,240 @@
+"""
+Offline Re-scoring
+Re-applies the current rules and weights to stored scans without fetching
+anything: the stored headers, redirect chain, cookies and TLS details are
+checked again and the score, issues and rollups updated where the result
+changed.
+Scans are read in keyset chunks from the calling thread, which stays the
+only database writer; the checks themselves run on worker processes.
+"""
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .diffing import apply_diff, diff_scans
+from .executors import init_worker_process, rescore_chunk, scanner_options
+from .models import Issue, RescoreRun, ScanResult
+from .services import save_rescored_results
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+ISSUE_FIELDS = ('severity', 'category', 'message', 'recommendation')
+
+
+class _Chains:
+    """
+    State of the latest scan of each monitoring chain, keyed by the chain's
+    base scan. At most `max_chains` chains are remembered.
+    """
+
+    def __init__(self, max_chains=10000):
+        self.max_chains = max_chains
+        self._latest = OrderedDict()
+
+    def get(self, chain, scan_id):
+        """State of `chain` if its latest scan is `scan_id`"""
+        latest = self._latest.get(chain)
+        if latest is not None and latest[0] == scan_id:
+            return latest[1:]
+        return None
+
+    def put(self, chain, scan_id, *state):
+        self._latest[chain] = (scan_id, *state)
+        self._latest.move_to_end(chain)
+        if len(self._latest) > self.max_chains:
+            self._latest.popitem(last=False)
+
+
+def _chain_of(scan):
+    return scan.id if scan.diff is None else scan.base_id
+
+
+def _is_chained(scan):
+    return scan.target_id is not None or scan.diff is not None
+
+
+def _issue_keys(issues):
+    """Issues as a sorted list of tuples: diff scans rebuild them in a different order"""
+    return sorted(tuple(issue[field] for field in ISSUE_FIELDS) for issue in issues)
+
+
+def _same_diff(old, new):
+    return (
+        old['score_delta'] == new['score_delta']
+        and _issue_keys(old['issues']['added']) == _issue_keys(new['issues']['added'])
+        and sorted(map(tuple, old['issues']['removed'])) == sorted(map(tuple, new['issues']['removed']))
+    )
+
+
+class Rescorer:
+    """
+    Re-scores the done scans of a queryset, `chunk_size` at a time, on
+    `processes` worker processes (one per core by default; 1 runs the
+    checks in this thread). With `dry_run` nothing is written and only the
+    number of changed scans is reported.
+    """
+
+    def __init__(self, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        # Stored (headers, issues) of each chain, to rebuild diff scans
+        self._old = _Chains()
+        # Re-scored (issues, score), which diff scans are now diffed against
+        self._new = _Chains()
+
+    def _chunks(self, queryset):
+        """Keyset chunks of done scans with what re-scoring reads, oldest first"""
+        queryset = (
+            queryset.filter(status='done').order_by('id')
+            .select_related('header_set')
+            .prefetch_related(Prefetch('issues', queryset=Issue.objects.order_by('id').only('scan_result', *ISSUE_FIELDS)))
+        )
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:self.chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+
+    def _stored(self, scan):
+        """(headers, issue dicts) of a scan as stored, diff scans rebuilt from their chain"""
+        if scan.diff is None:
+            headers = scan.headers
+            issues = [{field: getattr(issue, field) for field in ISSUE_FIELDS} for issue in scan.issues.all()]
+        else:
+            state = self._old.get(scan.base_id, scan.previous_id)
+            if state is not None:
+                headers, issues = apply_diff(*state, scan.diff)
+            else:
+                headers, issues = scan.materialize()
+        if _is_chained(scan):
+            self._old.put(_chain_of(scan), scan.id, headers, issues)
+        return headers, issues
+
+    def _prepare(self, chunk):
+        """Stored issues of each scan of a chunk, and the items for rescore_chunk()"""
+        stored, items = [], []
+        for scan in chunk:
+            headers, issues = self._stored(scan)
+            stored.append((headers, issues))
+            items.append((
+                scan.id, scan.final_url or scan.url, headers, scan.redirect_chain, scan.tls, scan.cookies,
+                scan.finished_at, issues,
+            ))
+        return stored, items
+
+    def _previous_state(self, scan):
+        """Re-scored (issues, score) of the scan a diff scan follows, or None if it is gone"""
+        state = self._new.get(scan.base_id, scan.previous_id)
+        if state is not None:
+            return state
+        previous = ScanResult.objects.filter(id=scan.previous_id).first()
+        if previous is None:
+            return None
+        # Earlier than this run, or outside its range: already current
+        return previous.materialize()[1], previous.score
+
+    def _apply(self, chunk, stored, results):
+        """Write the chunk's changed results; returns how many changed"""
+        changes = []
+        for scan, (headers, old_issues), (scan_id, score, issues) in zip(chunk, stored, results):
+            diff = scan.diff
+            if diff is not None:
+                previous = self._previous_state(scan)
+                if previous is not None:
+                    changed = diff_scans({}, previous[0], previous[1], {}, issues, score)
+                    diff = {**diff, 'issues': changed['issues'], 'score_delta': changed['score_delta']}
+            if _is_chained(scan):
+                self._new.put(_chain_of(scan), scan.id, issues, score)
+
+            if (score != scan.score or _issue_keys(issues) != _issue_keys(old_issues)
+                    or (diff is not None and not _same_diff(scan.diff, diff))):
+                changes.append((scan, old_issues, score, issues, diff))
+
+        if changes and not self.dry_run:
+            save_rescored_results(changes)
+        return len(changes)
+
+    def _results(self, prepared):
+        """rescore_chunk() results of each prepared chunk, in order"""
+        if self.processes <= 1:
+            for chunk, stored, items in prepared:
+                yield chunk, stored, rescore_chunk(items)
+            return
+
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(self.processes, initializer=init_worker_process, initargs=(scanner_options(),)) as pool:
+            # A couple of chunks per process in flight keeps the workers busy
+            # without reading far ahead of the writes
+            in_flight = []
+            for chunk, stored, items in prepared:
+                in_flight.append((chunk, stored, pool.apply_async(rescore_chunk, (items,))))
+                if len(in_flight) >= self.processes * 2:
+                    chunk, stored, pending = in_flight.pop(0)
+                    yield chunk, stored, pending.get()
+            for chunk, stored, pending in in_flight:
+                yield chunk, stored, pending.get()
+
+    def rescore(self, queryset, on_chunk=None):
+        """
+        Re-score the done scans of `queryset`. `on_chunk(processed, changed)`
+        is called with the running totals after each chunk is written.
+        Returns (processed, changed).
+        """
+        processed = changed = 0
+        prepared = ((chunk, *self._prepare(chunk)) for chunk in self._chunks(queryset))
+        for chunk, stored, results in self._results(prepared):
+            changed += self._apply(chunk, stored, results)
+            processed += len(chunk)
+            if on_chunk:
+                on_chunk(processed, changed)
+        return processed, changed
+
+    def run(self, rescore_run):
+        """Re-score the scans selected by a RescoreRun, keeping its progress up to date"""
+        queryset = ScanResult.objects.all()
+        if rescore_run.since is not None:
+            queryset = queryset.filter(created_at__gte=rescore_run.since)
+        if rescore_run.until is not None:
+            queryset = queryset.filter(created_at__lt=rescore_run.until)
+
+        rescore_run.total = queryset.filter(status='done').count()
+        rescore_run.status = 'running'
+        rescore_run.save(update_fields=['total', 'status'])
+
+        def on_chunk(processed, changed):
+            RescoreRun.objects.filter(pk=rescore_run.pk).update(processed=processed, changed=changed)
+
+        try:
+            rescore_run.processed, rescore_run.changed = self.rescore(queryset, on_chunk=on_chunk)
+            rescore_run.status = 'done'
+        except Exception as e:
+            rescore_run.status = 'failed'
+            rescore_run.error = str(e)
+            rescore_run.processed, rescore_run.changed = (
+                RescoreRun.objects.filter(pk=rescore_run.pk).values_list('processed', 'changed').get()
+            )
+        rescore_run.finished_at = timezone.now()
+        rescore_run.save(update_fields=['processed', 'changed', 'status', 'error', 'finished_at'])
+        return rescore_run
+
+
+def start_rescore(rescore_run, **rescorer_options):
+    """Run a RescoreRun on a background thread and return immediately"""
+    def target():
+        try:
+            Rescorer(dry_run=rescore_run.dry_run, **rescorer_options).run(RescoreRun.objects.get(pk=rescore_run.pk))
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=target, name=f'rescore-{rescore_run.id}', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,256 @@
+"""
+Scan Retention
+Moves finished scans past the retention limits, with their issues, out of
+the database into append-only archive files, and reads them back by id.
+
+Limits are an age and a number of scans per owner (RETENTION_MAX_AGE_DAYS
+and RETENTION_MAX_SCANS_PER_OWNER, or the owner's RetentionPolicy), and a
+number of scans overall (RETENTION_MAX_SCANS). Expired scans are archived
+`batch_size` at a time: each batch is appended to the file of its month
+(scans-YYYY-MM.ndjson.gz under SCAN_ARCHIVE_DIR) as one gzip member, with a
+JSON line per scan, and only then removed from the database together with
+the creation of their ArchivedScan index rows. A concatenation of gzip
+members is itself a gzip file, so the archives read with zcat, while a
+single scan is found by decompressing only the member it is in.
+
+Archived scans stay counted in the dashboard rollups. Monitoring diff scans
+that build on an archived scan are first turned into full snapshots.
+Only one prune should run at a time.
+"""
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .export import ISSUE_FIELDS, SCAN_FIELDS
+from .models import ArchivedScan, Issue, RetentionPolicy, ScanResult
+from .services import snapshot_scan_results
+
+
+DEFAULT_BATCH_SIZE = 500
+
+FINISHED = ('done', 'failed')
+
+# Stored with each scan besides the export fields, so it can be shown again
+DETAIL_FIELDS = ('started_at', 'timings', 'redirect_chain', 'tls', 'cookies')
+
+
+def archive_dir():
+    return Path(getattr(settings, 'SCAN_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive'))
+
+
+def _beyond_newest(queryset, keep):
+    """The scans of `queryset` other than its `keep` newest, or None if there are no others"""
+    cutoff = list(queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[keep:keep + 1])
+    if not cutoff:
+        return None
+    created_at, scan_id = cutoff[0]
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=scan_id))
+
+
+def expired_scans(now=None):
+    """
+    Yield (limit, queryset) for each retention limit that finished scans
+    are past. Querysets may overlap, and are built as they are asked for,
+    so a count limit only sees the scans that earlier limits left.
+    """
+    now = now or timezone.now()
+    finished = ScanResult.objects.filter(status__in=FINISHED)
+    policies = list(RetentionPolicy.objects.all())
+    with_policy = [policy.owner_id for policy in policies]
+
+    max_age_days = getattr(settings, 'RETENTION_MAX_AGE_DAYS', None)
+    if max_age_days:
+        yield 'age', finished.filter(created_at__lt=now - timedelta(days=max_age_days)).exclude(owner__in=with_policy)
+    for policy in policies:
+        if policy.max_age is not None:
+            yield 'age', finished.filter(owner_id=policy.owner_id, created_at__lt=now - policy.max_age)
+
+    max_scans_per_owner = getattr(settings, 'RETENTION_MAX_SCANS_PER_OWNER', None)
+    if max_scans_per_owner is not None:
+        over = (
+            finished.exclude(owner__in=with_policy).values('owner')
+            .annotate(scans=Count('id')).filter(scans__gt=max_scans_per_owner)
+            .values_list('owner', flat=True)
+        )
+        for owner_id in list(over):
+            expired = _beyond_newest(finished.filter(owner=owner_id), max_scans_per_owner)
+            if expired is not None:
+                yield 'owner count', expired
+    for policy in policies:
+        if policy.max_scans is not None:
+            expired = _beyond_newest(finished.filter(owner_id=policy.owner_id), policy.max_scans)
+            if expired is not None:
+                yield 'owner count', expired
+
+    max_scans = getattr(settings, 'RETENTION_MAX_SCANS', None)
+    if max_scans is not None:
+        expired = _beyond_newest(finished, max_scans)
+        if expired is not None:
+            yield 'total count', expired
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def scan_record(scan):
+    """A ScanResult as the dict written to the archive, with its full headers and issues"""
+    if scan.diff is None:
+        headers = scan.headers
+        issues = [{field: getattr(issue, field) for field in ISSUE_FIELDS} for issue in scan.issues.all()]
+    else:
+        headers, issues = scan.materialize()
+    record = {field: getattr(scan, field) for field in SCAN_FIELDS + DETAIL_FIELDS}
+    for field in ('created_at', 'started_at', 'finished_at'):
+        record[field] = _isoformat(record[field])
+    record['headers'] = headers
+    record['issues'] = issues
+    return record
+
+
+def _rebase_successors(ids):
+    """
+    Make the monitoring diff scans that are left out of `ids` independent
+    of the scans in it: the first left in each chain becomes a full
+    snapshot, and the ones after it build on that instead
+    """
+    successors = list(
+        ScanResult.objects.filter(Q(previous_id__in=ids) | Q(base_id__in=ids), diff__isnull=False)
+        .exclude(id__in=ids).select_related('header_set').order_by('id')
+    )
+    new_base = {}
+    snapshots, rebased = [], []
+    for scan in successors:
+        if scan.previous_id in ids or scan.base_id not in new_base:
+            new_base[scan.base_id] = scan
+            snapshots.append(scan)
+        else:
+            rebased.append((scan, new_base[scan.base_id]))
+
+    # Rebuilt before anything changes, while the chains are whole
+    items = [(scan, *scan.materialize()) for scan in snapshots]
+    if items:
+        snapshot_scan_results(items)
+    for scan, base in rebased:
+        scan.base = base
+    if rebased:
+        ScanResult.objects.bulk_update([scan for scan, base in rebased], ['base'])
+    return len(items)
+
+
+class Archiver:
+    """
+    Moves scans into the archive files under `directory`, `batch_size` at
+    a time. With `dry_run` scans are only counted.
+    """
+
+    def __init__(self, directory=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.directory = Path(directory) if directory is not None else archive_dir()
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    def _batches(self, queryset):
+        """Keyset batches of the scans of `queryset`, oldest first"""
+        queryset = (
+            queryset.order_by('id').select_related('header_set')
+            .prefetch_related(Prefetch('issues', queryset=Issue.objects.order_by('id')))
+        )
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:self.batch_size])
+            if not batch:
+                return
+            last_id = batch[-1].id
+            yield batch
+
+    def _append(self, name, lines):
+        """Append `lines` to archive file `name` as one gzip member; returns its (offset, length)"""
+        data = gzip.compress(''.join(lines).encode('utf-8'))
+        with open(self.directory / name, 'ab') as archive:
+            offset = archive.seek(0, os.SEEK_END)
+            archive.write(data)
+            archive.flush()
+            os.fsync(archive.fileno())
+        return offset, len(data)
+
+    def _archive_batch(self, batch):
+        months = {}
+        for scan in batch:
+            name = f'scans-{timezone.localtime(scan.created_at):%Y-%m}.ndjson.gz'
+            months.setdefault(name, []).append(scan)
+
+        # The files are written first: if storing the index then fails, the
+        # scans are still in the database and the members are never read
+        entries = []
+        for name, scans in months.items():
+            lines = [json.dumps(scan_record(scan), separators=(',', ':')) + '\n' for scan in scans]
+            offset, length = self._append(name, lines)
+            entries += [
+                ArchivedScan(
+                    scan_id=scan.id, url=scan.url, owner_id=scan.owner_id, status=scan.status, score=scan.score,
+                    created_at=scan.created_at, path=str(self.directory.resolve() / name), offset=offset, length=length,
+                )
+                for scan in scans
+            ]
+
+        ids = {scan.id for scan in batch}
+        with transaction.atomic():
+            _rebase_successors(ids)
+            ArchivedScan.objects.bulk_create(entries)
+            Issue.objects.filter(scan_result_id__in=ids).delete()
+            ScanResult.objects.filter(id__in=ids).delete()
+
+    def archive(self, queryset, on_batch=None):
+        """
+        Archive the scans of `queryset`. `on_batch(archived)` is called with
+        the running total after each batch. Returns the number archived.
+        """
+        if self.dry_run:
+            return queryset.count()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        archived = 0
+        for batch in self._batches(queryset):
+            self._archive_batch(batch)
+            archived += len(batch)
+            if on_batch:
+                on_batch(archived)
+        return archived
+
+    def prune(self, now=None, on_batch=None):
+        """Archive every scan past a retention limit; returns the number archived per limit"""
+        archived = {}
+        for limit, queryset in expired_scans(now):
+            archived[limit] = archived.get(limit, 0) + self.archive(queryset, on_batch=on_batch)
+        return archived
+
+
+def read_archived(scan_id):
+    """The archived record of a scan, as written by scan_record(), or None if it is not archived"""
+    entry = ArchivedScan.objects.filter(scan_id=scan_id).first()
+    if entry is None:
+        return None
+    # The path is absolute, so scans archived to another directory are found too
+    with open(entry.path, 'rb') as archive:
+        archive.seek(entry.offset)
+        data = gzip.decompress(archive.read(entry.length))
+    for line in data.splitlines():
+        record = json.loads(line)
+        if record['id'] == scan_id:
+            return record
+    return None
+
+
+def archived_scan_result(record):
+    """An unsaved ScanResult holding an archived record, for pages that show a scan; returns (scan, issue dicts)"""
+    values = {field: record[field] for field in SCAN_FIELDS + DETAIL_FIELDS}
+    for field in ('created_at', 'started_at', 'finished_at'):
+        values[field] = parse_datetime(values[field]) if values[field] else None
+    return ScanResult(**values, raw_headers=record['headers']), record['issues']
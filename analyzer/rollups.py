@@ -0,0 +1,249 @@
+"""
+Dashboard Rollups
+Daily aggregates of stored scans: score distribution, per-domain trends and
+issue counts. They are incremented in the same transaction that stores each
+scan, so the dashboard reads a few small, indexed rows per day instead of
+grouping ScanResult and Issue on every page view.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .export import ChainIssues, export_queryset
+from .models import DailyDomainStats, DailyIssueStats, DailyScoreBucket, MonthlyIssueStats, ScanResult
+
+
+SCORE_BUCKET_WIDTH = 10
+DEFAULT_REBUILD_CHUNK_SIZE = 2000
+
+# Position of each severity's count in a DailyDomainStats increment
+SEVERITY_INDEX = {'high': 2, 'medium': 3, 'low': 4}
+
+
+def score_bucket(score):
+    """Lower bound of the score's bucket; 100 falls in the 90-100 bucket"""
+    return min(max(score, 0), 99) // SCORE_BUCKET_WIDTH * SCORE_BUCKET_WIDTH
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def domain_of(url):
+    return (urlsplit(url).hostname or '')[:255]
+
+
+def _increment(model, key_fields, count_fields, rows):
+    """
+    Add the counts of `rows` (tuples of key values then counts) to `model`,
+    creating missing rows. One INSERT ... ON CONFLICT DO UPDATE statement
+    on databases that support it, a query or two per row elsewhere.
+    Rows taking counts away (re-scoring) are updated one by one, since an
+    upsert's inserted row is checked before its conflict. They never create
+    a row or take a count below zero: scans stored before the rollups
+    existed were never added to them. Rows left with nothing are deleted.
+    """
+    rows = [row for row in rows if any(row[len(key_fields):])]
+    decrements = [row for row in rows if min(row[len(key_fields):]) < 0]
+    rows = [row for row in rows if min(row[len(key_fields):]) >= 0]
+    if rows and connection.features.supports_update_conflicts_with_target:
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        keys = [quote(model._meta.get_field(name).column) for name in key_fields]
+        counts = [quote(model._meta.get_field(name).column) for name in count_fields]
+        sql = (
+            f"INSERT INTO {table} ({', '.join(keys + counts)}) "
+            f"VALUES ({', '.join(['%s'] * (len(keys) + len(counts)))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            + ', '.join(f'{column} = {table}.{column} + excluded.{column}' for column in counts)
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        rows = []
+
+    for row in rows:
+        key = dict(zip(key_fields, row))
+        counts = dict(zip(count_fields, row[len(key_fields):]))
+        updated = model.objects.filter(**key).update(**{name: F(name) + value for name, value in counts.items()})
+        if not updated:
+            model.objects.create(**key, **counts)
+    for row in decrements:
+        key = dict(zip(key_fields, row))
+        counts = dict(zip(count_fields, row[len(key_fields):]))
+        model.objects.filter(**key).update(**{name: Greatest(F(name) + value, 0) for name, value in counts.items()})
+        model.objects.filter(**key, **{name: 0 for name in count_fields}).delete()
+
+
+class RollupBatch:
+    """Rollup increments of a group of scans, summed in memory and written together"""
+
+    def __init__(self):
+        self.buckets = defaultdict(lambda: [0, 0])
+        self.domains = defaultdict(lambda: [0, 0, 0, 0, 0])
+        self.issues = defaultdict(int)
+
+    def add(self, scan_result, issues, weight=1):
+        """
+        Count a finished ScanResult and its issue dicts; a weight of -1 takes
+        them out again. Scans stored before finished_at was recorded count
+        on the day they were created.
+        """
+        day = timezone.localdate(scan_result.finished_at or scan_result.created_at or timezone.now())
+        score = max(scan_result.score, 0)
+
+        bucket = self.buckets[day, score_bucket(score)]
+        bucket[0] += weight
+        bucket[1] += weight * score
+
+        domain = self.domains[domain_of(scan_result.final_url or scan_result.url), day]
+        domain[0] += weight
+        domain[1] += weight * score
+        for issue in issues:
+            if issue['severity'] in SEVERITY_INDEX:
+                domain[SEVERITY_INDEX[issue['severity']]] += weight
+            self.issues[day, issue['severity'], issue['category'][:100], issue['message'][:255]] += weight
+
+    def save(self, apps=None):
+        """Write the increments; with `apps` (a migration's app registry) to its historical models"""
+        score_model, domain_model, issue_model, month_model = (
+            (DailyScoreBucket, DailyDomainStats, DailyIssueStats, MonthlyIssueStats) if apps is None else
+            [apps.get_model('analyzer', name)
+             for name in ('DailyScoreBucket', 'DailyDomainStats', 'DailyIssueStats', 'MonthlyIssueStats')]
+        )
+        adapt = connection.ops.adapt_datefield_value
+        _increment(score_model, ['day', 'bucket'], ['scans', 'score_total'], [
+            (adapt(day), bucket, *counts) for (day, bucket), counts in self.buckets.items()
+        ])
+        _increment(
+            domain_model, ['domain', 'day'], ['scans', 'score_total', 'high_count', 'medium_count', 'low_count'],
+            [(domain, adapt(day), *counts) for (domain, day), counts in self.domains.items()],
+        )
+        _increment(issue_model, ['day', 'severity', 'category', 'message'], ['count'], [
+            (adapt(day), severity, category, message, count)
+            for (day, severity, category, message), count in self.issues.items()
+        ])
+        months = defaultdict(int)
+        for (day, *issue), count in self.issues.items():
+            months[(month_of(day), *issue)] += count
+        _increment(month_model, ['month', 'severity', 'category', 'message'], ['count'], [
+            (adapt(month), severity, category, message, count)
+            for (month, severity, category, message), count in months.items()
+        ])
+
+
+def record_scans(items):
+    """Add (ScanResult, issue dicts) pairs of newly finished scans to the rollups"""
+    batch = RollupBatch()
+    for scan_result, issues in items:
+        batch.add(scan_result, issues)
+    batch.save()
+
+
+def rebuild(chunk_size=DEFAULT_REBUILD_CHUNK_SIZE):
+    """
+    Recompute every rollup from the stored scans in one transaction, reading
+    `chunk_size` scans at a time. Returns the number of scans counted.
+    Scans moved to the archive (analyzer.retention) are no longer stored,
+    so a rebuild drops them from the rollups.
+    """
+    scanned = 0
+    with transaction.atomic():
+        for model in (DailyScoreBucket, DailyDomainStats, DailyIssueStats, MonthlyIssueStats):
+            model.objects.all().delete()
+
+        chains = ChainIssues()
+        batch = RollupBatch()
+        scans = export_queryset(ScanResult.objects.filter(status='done')).iterator(chunk_size=chunk_size)
+        for scan in scans:
+            batch.add(scan, chains.issues(scan))
+            scanned += 1
+            if scanned % chunk_size == 0:
+                batch.save()
+                batch = RollupBatch()
+        batch.save()
+    return scanned
+
+
+def issue_totals(since):
+    """
+    Count of each (severity, category, message) found from `since` onwards:
+    daily rows up to the first whole month, monthly rows after that
+    """
+    month = since if since.day == 1 else next_month(since)
+    rows = [
+        DailyIssueStats.objects.filter(day__gte=since, day__lt=month),
+        MonthlyIssueStats.objects.filter(month__gte=month),
+    ]
+    totals = defaultdict(int)
+    for queryset in rows:
+        for row in queryset.values('severity', 'category', 'message').annotate(count=Sum('count')):
+            totals[row['severity'], row['category'], row['message']] += row['count']
+    return totals
+
+
+def dashboard_data(since, domain=None, top=10):
+    """
+    Aggregates for the dashboard from `since` (a date) onwards: score
+    distribution, daily trend (of one domain if given), most common issues
+    and issue counts per category
+    """
+    buckets = DailyScoreBucket.objects.filter(day__gte=since)
+
+    distribution = {
+        row['bucket']: row['scans']
+        for row in buckets.values('bucket').annotate(scans=Sum('scans'))
+    }
+    if domain:
+        trend_rows = (
+            DailyDomainStats.objects.filter(domain=domain, day__gte=since)
+            .values('day', 'scans', 'score_total', 'high_count', 'medium_count', 'low_count')
+        )
+    else:
+        trend_rows = buckets.values('day').annotate(scans=Sum('scans'), score_total=Sum('score_total'))
+
+    trend = []
+    for row in trend_rows.order_by('day'):
+        point = {
+            'day': row['day'].isoformat(),
+            'scans': row['scans'],
+            'average_score': round(row['score_total'] / row['scans'], 2) if row['scans'] else None,
+        }
+        for field in ('high_count', 'medium_count', 'low_count'):
+            if field in row:
+                point[field] = row[field]
+        trend.append(point)
+
+    issues = issue_totals(since)
+    categories = defaultdict(int)
+    for (severity, category, message), count in issues.items():
+        categories[category] += count
+    top_issues = sorted(issues.items(), key=lambda item: -item[1])[:top]
+
+    return {
+        'since': since.isoformat(),
+        'domain': domain,
+        'scans': sum(distribution.values()),
+        'score_distribution': [
+            {'min': bucket, 'max': 100 if bucket == 100 - SCORE_BUCKET_WIDTH else bucket + SCORE_BUCKET_WIDTH - 1,
+             'scans': distribution.get(bucket, 0)}
+            for bucket in range(0, 100, SCORE_BUCKET_WIDTH)
+        ],
+        'trend': trend,
+        'top_issues': [
+            {'severity': severity, 'category': category, 'message': message, 'count': count}
+            for (severity, category, message), count in top_issues
+        ],
+        'categories': [
+            {'category': category, 'count': count}
+            for category, count in sorted(categories.items(), key=lambda item: -item[1])
+        ],
+    }
@@ -0,0 +1,194 @@
+"""
+Header Rule Engine
+Loads declarative header rules from JSON (or YAML) and compiles them into a
+lowercased lookup table that is evaluated in a single pass over the headers
+"""
+import functools
+import json
+import re
+from pathlib import Path
+
+
+DEFAULT_RULES_PATH = Path(__file__).with_name('header_rules.json')
+
+SEVERITIES = ('high', 'medium', 'low')
+
+MAX_AGE_RE = re.compile(r'max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+
+
+def parse_csp(value):
+    """Split a Content-Security-Policy value into {directive: [sources]}"""
+    directives = {}
+    for part in value.split(';'):
+        tokens = part.split()
+        if tokens:
+            directives.setdefault(tokens[0].lower(), [t.lower() for t in tokens[1:]])
+    return directives
+
+
+# Value checks. Each factory takes the rule definition and returns a predicate
+# that is called with the header value and returns True when the value passes.
+
+def _equals(rule):
+    expected = str(rule['value']).strip().lower()
+    return lambda value: value.strip().lower() == expected
+
+
+def _one_of(rule):
+    allowed = {str(v).strip().lower() for v in rule['value']}
+    return lambda value: value.strip().lower() in allowed
+
+
+def _contains(rule):
+    needle = str(rule['value']).lower()
+    return lambda value: needle in value.lower()
+
+
+def _regex(rule):
+    pattern = re.compile(rule['value'], re.IGNORECASE)
+    return lambda value: pattern.search(value) is not None
+
+
+def _min_max_age(rule):
+    minimum = int(rule['value'])
+
+    def check(value):
+        match = MAX_AGE_RE.search(value)
+        return match is not None and int(match.group(1)) >= minimum
+    return check
+
+
+def _directive_present(rule):
+    directive = rule['directive'].lower()
+    return lambda value: directive in parse_csp(value)
+
+
+def _directive_excludes(rule):
+    directive = rule['directive'].lower()
+    source = str(rule['value']).lower()
+    # Sources that make browsers ignore `source`, e.g. a nonce for 'unsafe-inline'
+    unless = tuple(str(prefix).lower() for prefix in rule.get('unless', ()))
+
+    def check(value):
+        directives = parse_csp(value)
+        # Fetch directives fall back to default-src when they are not set
+        sources = directives.get(directive, directives.get('default-src', []))
+        if unless and any(s.startswith(unless) for s in sources):
+            return True
+        return source not in sources
+    return check
+
+
+VALUE_CHECKS = {
+    'equals': _equals,
+    'one_of': _one_of,
+    'contains': _contains,
+    'regex': _regex,
+    'min_max_age': _min_max_age,
+    'directive_present': _directive_present,
+    'directive_excludes': _directive_excludes,
+}
+
+
+class Rule:
+    """A single compiled header rule"""
+
+    __slots__ = ('id', 'order', 'headers', 'check', 'severity', 'category', 'message', 'recommendation', 'points')
+
+    def __init__(self, definition, order):
+        self.id = definition.get('id', f'rule-{order}')
+        self.order = order
+
+        headers = definition.get('header')
+        if isinstance(headers, str):
+            headers = [headers]
+        if not headers:
+            raise ValueError(f"Rule {self.id}: 'header' is required")
+        self.headers = tuple(h.lower() for h in headers)
+
+        self.check = definition.get('check', 'present')
+        if self.check != 'present' and self.check not in VALUE_CHECKS:
+            raise ValueError(f"Rule {self.id}: unknown check '{self.check}'")
+
+        self.severity = definition.get('severity')
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Rule {self.id}: severity must be one of {', '.join(SEVERITIES)}")
+
+        try:
+            self.category = definition['category']
+            self.message = definition['message']
+            self.recommendation = definition['recommendation']
+            self.points = int(definition['points'])
+        except KeyError as e:
+            raise ValueError(f"Rule {self.id}: {e.args[0]!r} is required")
+
+
+class RuleSet:
+    """
+    Compiled rules.
+    Presence rules are stored as sets of lowercased alternative header names;
+    value rules are grouped by lowercased header name so each header only
+    runs the predicates that apply to it.
+    """
+
+    def __init__(self, definitions):
+        self.definitions = list(definitions)
+        self.rules = []
+        self._presence = []
+        self._by_header = {}
+
+        for order, definition in enumerate(definitions):
+            rule = Rule(definition, order)
+            self.rules.append(rule)
+            if rule.check == 'present':
+                self._presence.append((frozenset(rule.headers), rule))
+            else:
+                predicate = VALUE_CHECKS[rule.check](definition)
+                for header in rule.headers:
+                    self._by_header.setdefault(header, []).append((predicate, rule))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __reduce__(self):
+        # The predicates are closures; pickle the definitions and recompile
+        return RuleSet, (self.definitions,)
+
+    def evaluate(self, headers):
+        """Return the rules that fail for a header mapping, in definition order"""
+        present = set()
+        failed = []
+        for name, value in headers.items():
+            name = name.lower()
+            present.add(name)
+            for predicate, rule in self._by_header.get(name, ()):
+                if not predicate(str(value)):
+                    failed.append(rule)
+
+        for names, rule in self._presence:
+            if names.isdisjoint(present):
+                failed.append(rule)
+
+        failed.sort(key=lambda rule: rule.order)
+        return failed
+
+
+def load_rules(path):
+    """Read rule definitions from a .json, .yaml or .yml file"""
+    path = Path(path)
+    with open(path, encoding='utf-8') as f:
+        if path.suffix in ('.yaml', '.yml'):
+            import yaml  # optional, only needed for YAML rule files
+            definitions = yaml.safe_load(f)
+        else:
+            definitions = json.load(f)
+
+    if isinstance(definitions, dict):
+        definitions = definitions.get('rules', [])
+    return definitions
+
+
+@functools.lru_cache(maxsize=None)
+def load_ruleset(path=DEFAULT_RULES_PATH):
+    """Load and compile a rule file once per process"""
+    return RuleSet(load_rules(path))
@@ -2,55 +2,474 @@
 Security Scanner Engine
 Analyzes URLs for security issues and generates a score
 """
+import copy
+import socket
+import ssl
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
 import requests
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse, urlsplit
+from urllib3.exceptions import InsecureRequestWarning
+
+from . import metrics
+from .cookies import SetCookie, parse_set_cookies
+from .rules import load_ruleset
+from .tls import TLSInfo, tls_for_url, tls_issues
+from .transport import collect_phase_timings, get_transport
+
+
+USER_AGENT = 'WebGuard Security Scanner/1.0'
+
+# Fetch modes: a streamed GET, or HEAD first with a streamed GET as fallback
+FETCH_GET = 'get'
+FETCH_HEAD = 'head'
+
+# Servers answering HEAD with these statuses get a GET instead
+HEAD_FALLBACK_STATUSES = {405, 501}
+
+# Sites whose certificate does not verify are fetched again without verification on purpose
+warnings.filterwarnings('ignore', category=InsecureRequestWarning)
+
+# Cookie checks, and the points each severity of cookie issue costs
+COOKIE_CATEGORY = 'Cookie Security'
+COOKIE_POINTS = {'high': 10, 'medium': 8, 'low': 5}
+
+
+class ScanError(Exception):
+    """
+    A URL could not be scanned. `reason` is a short machine-readable cause:
+    dns, connect, tls, certificate, timeout, redirects, invalid_url or http.
+    `certificate` means the handshake worked but the certificate chain did
+    not verify (expired, self-signed, wrong host, unknown CA) on a redirect
+    hop; on the final URL that is scored as an issue instead.
+    """
+
+    def __init__(self, message, reason='http'):
+        super().__init__(message)
+        self.reason = reason
+
+
+def iter_causes(exc):
+    """`exc` followed by the exceptions it wraps, including urllib3's MaxRetryError.reason"""
+    seen = set()
+    pending = [exc]
+    while pending:
+        exc = pending.pop(0)
+        if not isinstance(exc, BaseException) or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        yield exc
+        pending.extend([exc.__cause__, exc.__context__, getattr(exc, 'reason', None)])
+        pending.extend(exc.args)
+
+
+def certificate_verify_error(exc):
+    """Why the certificate chain did not verify, if that is what `exc` is about, else None"""
+    for cause in iter_causes(exc):
+        if isinstance(cause, ssl.SSLCertVerificationError):
+            return cause.verify_message or str(cause)
+    return None
+
+
+def unverified_tls(tls, verify_error):
+    """A copy of the (shared, cached) TLSInfo `tls` marked as not verified"""
+    tls = copy.copy(tls)
+    tls.verify_error = verify_error
+    return tls
+
+
+def classify_fetch_error(exc):
+    """Failure reason for a requests exception"""
+    exceptions = requests.exceptions
+    if isinstance(exc, (exceptions.InvalidURL, exceptions.MissingSchema, exceptions.InvalidSchema)):
+        return 'invalid_url'
+    if isinstance(exc, exceptions.TooManyRedirects):
+        return 'redirects'
+    if isinstance(exc, exceptions.SSLError):
+        if any(isinstance(cause, ssl.SSLCertVerificationError) for cause in iter_causes(exc)):
+            return 'certificate'
+        return 'tls'
+    if isinstance(exc, exceptions.Timeout):
+        return 'timeout'
+    if isinstance(exc, exceptions.ConnectionError):
+        if any(isinstance(cause, socket.gaierror) or type(cause).__name__ == 'NameResolutionError'
+               for cause in iter_causes(exc)):
+            return 'dns'
+        return 'connect'
+    return 'http'
+
+
+def record_failure(reason):
+    metrics.SCAN_FAILURES.labels(reason).inc()
+    metrics.SCANS_TOTAL.labels('failed').inc()
+
+
+def record_timings(timings, outcome):
+    """
+    Report a finished scan's phase timings (seconds) to the metrics registry
+    and return them in milliseconds for storing with the result
+    """
+    metrics.SCANS_TOTAL.labels(outcome).inc()
+    if 'fetch' in timings:
+        metrics.FETCH_SECONDS.observe(timings['fetch'])
+    for phase, seconds in timings.items():
+        metrics.PHASE_SECONDS.labels(phase).observe(seconds)
+    return {phase: round(seconds * 1000, 3) for phase, seconds in timings.items()}
+
+
+def normalize_url(url):
+    """Strip whitespace and default to HTTPS when no scheme is given"""
+    url = (url or '').strip()
+    if url and not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+class Hop:
+    """
+    One response of a redirect traversal: its status, headers and cookies,
+    and the absolute URL it redirects to (None for the final response)
+    """
+
+    __slots__ = ('url', 'status_code', 'headers', 'cookies', 'location', 'elapsed', 'cached')
+
+    def __init__(self, url, status_code, headers, cookies=(), location=None, elapsed=0.0, cached=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.cookies = list(cookies)  # SetCookie records, as sent
+        self.location = location
+        self.elapsed = elapsed        # seconds until the response headers arrived
+        self.cached = cached
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'status_code': self.status_code,
+            'location': self.location,
+            'headers': self.headers,
+            'cookies': [cookie.to_dict() for cookie in self.cookies],
+            'cached': self.cached,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Hop from a stored to_dict()"""
+        return cls(data['url'], data['status_code'], data['headers'],
+                   cookies=[SetCookie.from_dict(cookie) for cookie in data.get('cookies', ())],
+                   location=data.get('location'), cached=data.get('cached', False))
+
+
+class RedirectTargetCache:
+    """
+    Responses of recently fetched redirect targets, such as a shared SSO
+    login page, so that bulk scans redirected to the same URL fetch it once
+    per `ttl` seconds instead of once per scan
+    """
+
+    def __init__(self, ttl=300, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(url)
+                hop = entry[0]
+            else:
+                hop = None
+        metrics.REDIRECT_CACHE.labels('miss' if hop is None else 'hit').inc()
+        if hop is None:
+            return None
+        return Hop(hop.url, hop.status_code, hop.headers, hop.cookies, hop.location, cached=True)
+
+    def put(self, url, hop):
+        if not 200 <= hop.status_code < 400 or hop.status_code == 304:
+            return
+        with self._lock:
+            self._entries[url] = (hop, time.monotonic() + self.ttl)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def merge_cookies(hops, cookies):
+    """Cookies set anywhere along the chain, once per name; the final response wins"""
+    merged = {}
+    for cookie in [cookie for hop in hops for cookie in hop.cookies] + list(cookies):
+        merged[cookie.name] = cookie
+    return list(merged.values())
 
 
 class SecurityScanner:
     """Main security scanner class"""
     
-    def __init__(self):
+    # Defaults, overridable per instance (and from Django settings in AnalyzerConfig.ready)
+    fetch_mode = FETCH_GET
+    max_body_bytes = 64 * 1024  # body bytes read before the connection is closed
+    timeout = 10
+    header_rules = None  # compiled RuleSet, defaults to the bundled header_rules.json
+    max_redirects = 10
+    redirect_cache = RedirectTargetCache()  # shared by every scanner in the process, None disables
+    
+    def __init__(self, transport=None, fetch_mode=None, max_body_bytes=None, timeout=None):
         self.score = 100
         self.issues = []
+        self.transport = transport
+        if fetch_mode is not None:
+            self.fetch_mode = fetch_mode
+        if max_body_bytes is not None:
+            self.max_body_bytes = max_body_bytes
+        if timeout is not None:
+            self.timeout = timeout
     
-    def scan_url(self, url):
+    def scan_url(self, url, etag=None, last_modified=None, on_html=None):
         """
         Scan a URL and return security analysis
-        Returns: dict with score, issues, headers, status_code, final_url
+        Returns: dict with score, issues, headers, status_code, final_url,
+        redirects (one dict per redirect hop), tls (certificate and protocol
+        of an https final URL) and timings (milliseconds per phase: dns,
+        connect, tls, fetch, redirect, analysis).
+        Raises ScanError if the URL cannot be fetched.
+        
+        When `etag` or `last_modified` from an earlier scan are given, the
+        request is made conditional. If the server answers 304 Not Modified
+        the checks are skipped and the dict only has not_modified=True,
+        headers, status_code, final_url, redirects, tls and timings.
+        
+        `on_html` is called with each chunk (bytes) of the body as it is
+        streamed, if the response is HTML. HEAD is skipped in that case.
         """
+        request_headers = {'User-Agent': USER_AGENT}
+        if etag:
+            request_headers['If-None-Match'] = etag
+        if last_modified:
+            request_headers['If-Modified-Since'] = last_modified
+        
+        metrics.SCANS_IN_FLIGHT.inc()
         try:
-            # Fetch URL
-            response = requests.get(
-                url,
-                allow_redirects=True,
-                timeout=10,
-                headers={'User-Agent': 'WebGuard Security Scanner/1.0'}
-            )
-            
-            final_url = response.url
-            status_code = response.status_code
-            headers = dict(response.headers)
-            cookies = response.cookies
+            with collect_phase_timings() as timings:
+                started = time.perf_counter()
+                verify_error = None
+                try:
+                    final, hops = self._fetch(url, request_headers, on_html)
+                except requests.exceptions.RequestException as e:
+                    reason = classify_fetch_error(e)
+                    fetched = self._fetch_unverified(url, request_headers, on_html, e) if reason == 'certificate' else None
+                    if fetched is None:
+                        record_failure(reason)
+                        raise ScanError(f"Failed to fetch URL: {str(e)}", reason) from e
+                    final, hops = fetched
+                    verify_error = certificate_verify_error(e)
+                timings['fetch'] = time.perf_counter() - started
+            if hops:
+                timings['redirect'] = sum(hop.elapsed for hop in hops)
+            tls = tls_for_url(final.url)
+            if verify_error is not None and tls is not None:
+                tls = unverified_tls(tls, verify_error)
             
-            # Reset for new scan
-            self.score = 100
-            self.issues = []
+            if final.status_code == 304 and (etag or last_modified):
+                return {
+                    'not_modified': True,
+                    'headers': final.headers,
+                    'status_code': final.status_code,
+                    'final_url': final.url,
+                    'redirects': [hop.to_dict() for hop in hops],
+                    'tls': tls.to_dict() if tls else None,
+                    'timings': record_timings(timings, 'not_modified'),
+                }
             
-            # Run security checks
-            self._check_https(final_url)
-            self._check_security_headers(headers)
-            self._check_cookies(cookies)
-            
-            return {
-                'score': max(self.score, 0),  # Don't go below 0
-                'issues': self.issues,
-                'headers': headers,
-                'status_code': status_code,
-                'final_url': final_url,
-            }
+            started = time.perf_counter()
+            result = self.analyze(
+                final_url=final.url,
+                status_code=final.status_code,
+                headers=final.headers,
+                cookies=final.cookies,
+                hops=hops,
+                tls=tls,
+            )
+            timings['analysis'] = time.perf_counter() - started
+            result['timings'] = record_timings(timings, 'done')
+            return result
+        finally:
+            metrics.SCANS_IN_FLIGHT.dec()
+    
+    def _fetch(self, url, request_headers, on_html=None, verify=True):
+        """
+        Fetch URL over the shared keep-alive session, following redirects
+        one hop at a time so that every hop can be checked.
+        Returns (final Hop, list of redirect Hops). With `verify` false
+        certificates are not verified and the redirect cache is not used.
+        
+        The checks only need the status, headers and cookies, so the body is
+        never downloaded in full: HEAD is tried first in FETCH_HEAD mode, and
+        GETs are streamed and cut off after `max_body_bytes`. Redirect
+        targets are taken from `redirect_cache` when another scan fetched
+        them recently, unless the body is wanted for `on_html`.
+        """
+        session = (self.transport or get_transport()).session
+        cache = self.redirect_cache if on_html is None and verify else None
+        hops = []
+        while True:
+            hop = cache.get(url) if hops and cache is not None else None
+            if hop is None:
+                hop = self._fetch_hop(session, url, request_headers, on_html, verify)
+                if hops and verify and self.redirect_cache is not None:
+                    self.redirect_cache.put(url, hop)
+            if hop.location is None:
+                return hop, hops
+            hops.append(hop)
+            if len(hops) > self.max_redirects:
+                raise requests.exceptions.TooManyRedirects(f'Exceeded {self.max_redirects} redirects.')
+            url = hop.location
+    
+    def _fetch_hop(self, session, url, request_headers, on_html, verify=True):
+        """Fetch a single URL without following redirects"""
+        options = {
+            'allow_redirects': False,
+            'timeout': self.timeout,
+            'headers': request_headers,
+            'verify': verify,
+        }
+        
+        if self.fetch_mode == FETCH_HEAD and on_html is None:
+            response = session.head(url, **options)
+            response.close()
+            if response.status_code not in HEAD_FALLBACK_STATUSES:
+                return self._to_hop(session, response)
+        
+        response = session.get(url, stream=True, **options)
+        is_html = 'html' in response.headers.get('Content-Type', '').lower()
+        # Redirect bodies are read too (they are small) so the connection is reused
+        self._read_bounded(response, on_html if is_html and not response.is_redirect else None)
+        return self._to_hop(session, response)
+    
+    def _fetch_unverified(self, url, request_headers, on_html, error):
+        """
+        Fetch URL again without verifying certificates after `error`, a
+        verification failure, so the site can still be checked with that
+        failure scored as an issue. Returns (final Hop, list of redirect
+        Hops), or None if the failure was not on the final URL's host or
+        the second fetch fails too.
+        """
+        try:
+            final, hops = self._fetch(url, request_headers, on_html, verify=False)
+        except requests.exceptions.RequestException:
+            return None
+        failed = urlsplit(error.request.url) if error.request is not None else None
+        if failed is None or failed.netloc != urlsplit(final.url).netloc:
+            return None
+        return final, hops
+    
+    def _to_hop(self, session, response):
+        target = session.get_redirect_target(response)
+        return Hop(
+            url=response.url,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            cookies=parse_set_cookies(response.raw.headers.getlist('Set-Cookie')),
+            location=urljoin(response.url, target) if target else None,
+            elapsed=response.elapsed.total_seconds(),
+        )
+    
+    def _read_bounded(self, response, on_chunk=None):
+        """
+        Read at most `max_body_bytes` of a streamed body, passing each chunk
+        to `on_chunk`, then release the connection. A fully read body lets
+        the connection go back to the pool; a truncated one is closed.
+        """
+        received = 0
+        try:
+            if self.max_body_bytes > 0:
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                    received += len(chunk)
+                    if received >= self.max_body_bytes:
+                        break
+        finally:
+            response.close()
+        return received
+    
+    def analyze(self, final_url, status_code, headers, cookies, hops=(), tls=None):
+        """
+        Run the security checks against an already fetched response.
+        `cookies` are the SetCookie records of its Set-Cookie headers, and
+        `hops` the redirect Hops that led to the response; the chain and
+        cookies set along it are checked too. `tls` is the TLSInfo of the
+        final connection, if any.
+        Returns: dict with score, issues, headers, status_code, final_url, redirects, tls, cookies
+        """
+        # Reset for new scan
+        self.score = 100
+        self.issues = []
         
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to fetch URL: {str(e)}")
+        # Run security checks
+        self._check_https(final_url)
+        self._check_security_headers(headers)
+        self._check_redirects(hops, final_url)
+        self._check_cookies(merge_cookies(hops, cookies))
+        if tls is not None:
+            self._check_tls(tls)
+        
+        return {
+            'score': max(self.score, 0),  # Don't go below 0
+            'issues': self.issues,
+            'headers': headers,
+            'status_code': status_code,
+            'final_url': final_url,
+            'redirects': [hop.to_dict() for hop in hops],
+            'tls': tls.to_dict() if tls is not None else None,
+            'cookies': [cookie.to_dict() for cookie in cookies],
+        }
+    
+    def rescore(self, final_url, headers, redirects=(), tls=None, cookies=None, issues=(), scanned_at=None):
+        """
+        Re-run the checks on a stored result without fetching it again:
+        HTTPS, headers, the redirect chain (`redirects` as Hop.to_dict()
+        dicts), cookies (SetCookie.to_dict() dicts of the final response)
+        and TLS (a TLSInfo.to_dict() dict, with expiry judged as of
+        `scanned_at`). Results stored before cookies were (`cookies` None)
+        keep the cookie issues among the stored `issues`, charged at their
+        current cost.
+        Returns: dict with score and issues
+        """
+        self.score = 100
+        self.issues = []
+        hops = [Hop.from_dict(hop) for hop in redirects]
+        
+        self._check_https(final_url)
+        self._check_security_headers(headers)
+        self._check_redirects(hops, final_url)
+        if cookies is not None:
+            self._check_cookies(merge_cookies(hops, [SetCookie.from_dict(cookie) for cookie in cookies]))
+        else:
+            for issue in issues:
+                if issue['category'] == COOKIE_CATEGORY:
+                    self._add_issue(
+                        severity=issue['severity'],
+                        category=issue['category'],
+                        message=issue['message'],
+                        recommendation=issue['recommendation'],
+                        points=COOKIE_POINTS.get(issue['severity'], 0)
+                    )
+        if tls is not None:
+            self._check_tls(TLSInfo.from_dict(tls), now=scanned_at)
+        
+        return {
+            'score': max(self.score, 0),
+            'issues': self.issues,
+        }
     
     def _add_issue(self, severity, category, message, recommendation, points):
         """Add an issue and deduct points"""
@@ -75,77 +494,57 @@ class SecurityScanner:
             )
     
     def _check_security_headers(self, headers):
-        """Check for security headers"""
-        
-        # Content-Security-Policy (CSP)
-        if 'Content-Security-Policy' not in headers:
-            self._add_issue(
-                severity='high',
-                category='Content-Security-Policy',
-                message='Missing Content-Security-Policy header',
-                recommendation='Add CSP header to prevent XSS attacks and control resource loading.',
-                points=15
-            )
-        
-        # Strict-Transport-Security (HSTS)
-        if 'Strict-Transport-Security' not in headers:
+        """Check security headers against the compiled header rules"""
+        for rule in (self.header_rules or load_ruleset()).evaluate(headers):
             self._add_issue(
-                severity='high',
-                category='HSTS',
-                message='Missing Strict-Transport-Security header',
-                recommendation='Add HSTS header to force HTTPS connections and prevent protocol downgrade attacks.',
-                points=15
-            )
-        
-        # X-Frame-Options
-        if 'X-Frame-Options' not in headers:
-            self._add_issue(
-                severity='medium',
-                category='X-Frame-Options',
-                message='Missing X-Frame-Options header',
-                recommendation='Add X-Frame-Options header to prevent clickjacking attacks.',
-                points=10
-            )
-        
-        # X-Content-Type-Options
-        if 'X-Content-Type-Options' not in headers:
-            self._add_issue(
-                severity='medium',
-                category='X-Content-Type-Options',
-                message='Missing X-Content-Type-Options header',
-                recommendation='Add X-Content-Type-Options: nosniff to prevent MIME type sniffing.',
-                points=8
-            )
-        
-        # Referrer-Policy
-        if 'Referrer-Policy' not in headers:
-            self._add_issue(
-                severity='medium',
-                category='Referrer-Policy',
-                message='Missing Referrer-Policy header',
-                recommendation='Add Referrer-Policy header to control referrer information sent to other sites.',
-                points=7
+                severity=rule.severity,
+                category=rule.category,
+                message=rule.message,
+                recommendation=rule.recommendation,
+                points=rule.points
             )
+    
+    def _check_redirects(self, hops, final_url):
+        """Check the redirect chain for HTTPS downgrades and hops without HSTS"""
+        chain = [urlparse(hop.url) for hop in hops] + [urlparse(final_url)]
+        for source, target in zip(chain, chain[1:]):
+            if source.scheme == 'https' and target.scheme == 'http':
+                self._add_issue(
+                    severity='high',
+                    category='Redirects',
+                    message=f'Redirect from {source.geturl()} downgrades the connection to HTTP',
+                    recommendation='Keep every hop of the redirect chain on HTTPS; never redirect from HTTPS to HTTP.',
+                    points=20
+                )
+                break
         
-        # Permissions-Policy (formerly Feature-Policy)
-        if 'Permissions-Policy' not in headers and 'Feature-Policy' not in headers:
-            self._add_issue(
-                severity='low',
-                category='Permissions-Policy',
-                message='Missing Permissions-Policy header',
-                recommendation='Add Permissions-Policy header to control browser features and APIs.',
-                points=5
-            )
+        for source, target in zip(chain, chain[1:]):
+            if source.scheme == 'http' and target.scheme == 'https' and source.hostname != target.hostname:
+                self._add_issue(
+                    severity='low',
+                    category='Redirects',
+                    message=f'HTTP is upgraded to HTTPS on a different host ({source.hostname} to {target.hostname})',
+                    recommendation='Redirect HTTP to HTTPS on the same host first so that host can set HSTS, then redirect to the other host.',
+                    points=3
+                )
+                break
         
-        # X-XSS-Protection (legacy but still useful)
-        if 'X-XSS-Protection' not in headers:
-            self._add_issue(
-                severity='low',
-                category='X-XSS-Protection',
-                message='Missing X-XSS-Protection header',
-                recommendation='Add X-XSS-Protection header for legacy browser XSS protection.',
-                points=3
-            )
+        for hop in hops:
+            if urlparse(hop.url).scheme != 'https':
+                continue
+            if not any(name.lower() == 'strict-transport-security' for name in hop.headers):
+                self._add_issue(
+                    severity='medium',
+                    category='Redirects',
+                    message=f'Redirect from {hop.url} is missing the Strict-Transport-Security header',
+                    recommendation='Send Strict-Transport-Security on HTTPS redirects too, so browsers go straight to HTTPS on later visits.',
+                    points=8
+                )
+    
+    def _check_tls(self, tls, now=None):
+        """Check certificate verification, expiry and key, protocol version and cipher suite"""
+        for issue in tls_issues(tls, now):
+            self._add_issue(**issue)
     
     def _check_cookies(self, cookies):
         """Check cookie security attributes"""
@@ -156,31 +555,35 @@ class SecurityScanner:
             if not cookie.secure:
                 self._add_issue(
                     severity='high',
-                    category='Cookie Security',
+                    category=COOKIE_CATEGORY,
                     message=f'Cookie "{cookie_name}" missing Secure flag',
                     recommendation='Set Secure flag on cookies to ensure they are only sent over HTTPS.',
-                    points=10
+                    points=COOKIE_POINTS['high']
                 )
             
             # Check HttpOnly flag
-            if not cookie.has_nonstandard_attr('HttpOnly'):
+            if not cookie.httponly:
                 self._add_issue(
                     severity='medium',
-                    category='Cookie Security',
+                    category=COOKIE_CATEGORY,
                     message=f'Cookie "{cookie_name}" missing HttpOnly flag',
                     recommendation='Set HttpOnly flag on cookies to prevent JavaScript access and XSS attacks.',
-                    points=8
+                    points=COOKIE_POINTS['medium']
                 )
             
             # Check SameSite attribute
-            samesite = cookie.get_nonstandard_attr('SameSite')
-            if not samesite:
+            if not cookie.samesite:
                 self._add_issue(
                     severity='low',
-                    category='Cookie Security',
+                    category=COOKIE_CATEGORY,
                     message=f'Cookie "{cookie_name}" missing SameSite attribute',
                     recommendation='Set SameSite attribute on cookies to prevent CSRF attacks (use Strict or Lax).',
-                    points=5
+                    points=COOKIE_POINTS['low']
                 )
 
 
+if __name__ == '__main__':
+    # python -m analyzer.scanner: the Django-free command-line scanner
+    import sys
+    from analyzer.cli import main
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Persistence helpers shared by the views, the batch runner and management commands
+"""
+import time
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .cache import get_scan_cache
+from .headerstore import encode_headers, header_digest, split_headers
+from .models import HeaderSet, ScanResult, Issue
+from .rollups import RollupBatch, record_scans
+
+
+def save_scan_result(url, result_data, owner=None, batch=None):
+    """Store a scanner result dict as a ScanResult with its issues"""
+    return save_scan_results([(url, result_data)], owner=owner, batch=batch)[0]
+
+
+def save_scan_results(items, owner=None, batch=None, crawl=None):
+    """
+    Store many (url, result_data) pairs in a single transaction, using one
+    bulk INSERT for the ScanResults and one for all of their issues.
+    Returns the ScanResults in the same order as `items`.
+    """
+    now = timezone.now()
+    scan_results = [
+        ScanResult(
+            url=url,
+            final_url=result_data['final_url'],
+            status_code=result_data['status_code'],
+            score=result_data['score'],
+            owner=owner,
+            batch=batch,
+            crawl=crawl,
+            status='done',
+            finished_at=now,
+            timings=result_data.get('timings', {}),
+            redirect_chain=result_data.get('redirects', []),
+            tls=result_data.get('tls'),
+            cookies=result_data.get('cookies'),
+            **severity_counts(result_data['issues']),
+        )
+        for url, result_data in items
+    ]
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        store_headers(scan_results, [result_data['headers'] for url, result_data in items])
+        if connection.features.can_return_rows_from_bulk_insert:
+            ScanResult.objects.bulk_create(scan_results)
+        else:
+            for scan_result in scan_results:
+                scan_result.save(force_insert=True)
+
+        Issue.objects.bulk_create([
+            _build_issue(scan_result, issue)
+            for scan_result, (url, result_data) in zip(scan_results, items)
+            for issue in result_data['issues']
+        ])
+        record_scans((scan_result, result_data['issues']) for scan_result, (url, result_data) in zip(scan_results, items))
+    metrics.DB_WRITE_SECONDS.labels('bulk').observe(time.perf_counter() - started)
+
+    scan_cache = get_scan_cache()
+    for scan_result, (url, result_data) in zip(scan_results, items):
+        scan_cache.store(scan_result.url, scan_result, headers=result_data['headers'])
+    return scan_results
+
+
+def complete_scan_result(scan_result, result_data, previous=None, diff=None):
+    """
+    Fill in a queued ScanResult with the outcome of its scan.
+    When `diff` against `previous` is given (monitoring rescans), only the
+    diff is stored instead of the full headers and issue rows.
+    """
+    scan_result.final_url = result_data['final_url']
+    scan_result.status_code = result_data['status_code']
+    scan_result.score = result_data['score']
+    scan_result.status = 'done'
+    scan_result.error = ''
+    scan_result.failure_reason = ''
+    scan_result.redirect_chain = result_data.get('redirects', [])
+    scan_result.tls = result_data.get('tls')
+    scan_result.cookies = result_data.get('cookies')
+    scan_result.finished_at = timezone.now()
+    for field, count in severity_counts(result_data['issues']).items():
+        setattr(scan_result, field, count)
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        if diff is None:
+            store_headers([scan_result], [result_data['headers']])
+            issues = result_data['issues']
+        else:
+            scan_result.raw_headers = {}
+            scan_result.previous = previous
+            scan_result.base_id = previous.base_id or previous.id
+            scan_result.diff = diff
+            issues = []
+        # The job row already exists, so its issues can go in first and the
+        # final row update can carry the time spent writing them
+        Issue.objects.bulk_create([_build_issue(scan_result, issue) for issue in issues])
+        record_scans([(scan_result, result_data['issues'])])
+        scan_result.timings = {
+            **result_data.get('timings', {}),
+            'db_write': round((time.perf_counter() - started) * 1000, 3),
+        }
+        scan_result.save()
+    metrics.DB_WRITE_SECONDS.labels('complete').observe(time.perf_counter() - started)
+
+    get_scan_cache().store(scan_result.url, scan_result, headers=result_data['headers'])
+    return scan_result
+
+
+def save_rescored_results(changes):
+    """
+    Store re-scored results in one transaction. `changes` are (ScanResult,
+    old issue dicts, new score, new issue dicts, new diff) tuples. Full scans
+    get their Issue rows replaced and monitoring diff scans their diff; the
+    rollups move from the old result to the new one.
+    """
+    rollup = RollupBatch()
+    replaced = []
+    for scan_result, old_issues, score, issues, diff in changes:
+        rollup.add(scan_result, old_issues, weight=-1)
+        scan_result.score = score
+        for field, count in severity_counts(issues).items():
+            setattr(scan_result, field, count)
+        if scan_result.diff is None:
+            replaced.append((scan_result, issues))
+        else:
+            scan_result.diff = diff
+        rollup.add(scan_result, issues)
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        Issue.objects.filter(scan_result__in=[scan_result for scan_result, issues in replaced]).delete()
+        Issue.objects.bulk_create([
+            _build_issue(scan_result, issue) for scan_result, issues in replaced for issue in issues
+        ])
+        ScanResult.objects.bulk_update(
+            [change[0] for change in changes],
+            ['score', 'high_count', 'medium_count', 'low_count', 'diff'],
+            batch_size=500,
+        )
+        rollup.save()
+    metrics.DB_WRITE_SECONDS.labels('rescore').observe(time.perf_counter() - started)
+
+
+def snapshot_scan_results(items):
+    """
+    Turn monitoring diff scans into full snapshots, storing their headers
+    and issue rows like any other scan. `items` are (ScanResult, headers,
+    issue dicts) triples, as materialize() rebuilds them. Score, counts and
+    rollups are unchanged.
+    """
+    scan_results = [scan_result for scan_result, headers, issues in items]
+    with transaction.atomic():
+        store_headers(scan_results, [headers for scan_result, headers, issues in items])
+        for scan_result in scan_results:
+            scan_result.diff = None
+            scan_result.previous = None
+            scan_result.base = None
+        Issue.objects.bulk_create([
+            _build_issue(scan_result, issue) for scan_result, headers, issues in items for issue in issues
+        ])
+        ScanResult.objects.bulk_update(scan_results, ['header_set', 'raw_headers', 'diff', 'previous', 'base'])
+
+
+def scan_result_data(scan_result):
+    """Rebuild a scanner result dict from a stored ScanResult"""
+    headers, issues = scan_result.materialize()
+    return {
+        'final_url': scan_result.final_url,
+        'status_code': scan_result.status_code,
+        'score': scan_result.score,
+        'headers': headers,
+        'issues': issues,
+        'redirects': scan_result.redirect_chain,
+        'tls': scan_result.tls,
+        'cookies': scan_result.cookies,
+    }
+
+
+def fail_scan_result(scan_result, error, reason=''):
+    """Mark a queued ScanResult as failed, with the ScanError reason if known"""
+    scan_result.status = 'failed'
+    scan_result.error = error
+    scan_result.failure_reason = reason
+    scan_result.finished_at = timezone.now()
+    scan_result.save(update_fields=['status', 'error', 'failure_reason', 'finished_at'])
+    return scan_result
+
+
+def intern_header_sets(header_dicts):
+    """
+    Return a HeaderSet for each stable header dict, creating the missing
+    ones with a single bulk INSERT
+    """
+    digests = [header_digest(headers) for headers in header_dicts]
+    found = {hs.digest: hs for hs in HeaderSet.objects.filter(digest__in=set(digests))}
+
+    missing = {}
+    for digest, headers in zip(digests, header_dicts):
+        if digest not in found and digest not in missing:
+            missing[digest] = HeaderSet(digest=digest, headers=encode_headers(headers))
+    if missing:
+        # Another process may insert the same set concurrently
+        HeaderSet.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        found.update({hs.digest: hs for hs in HeaderSet.objects.filter(digest__in=list(missing))})
+
+    return [found[digest] for digest in digests]
+
+
+def store_headers(scan_results, header_dicts):
+    """
+    Point each ScanResult at the interned set of its stable headers and keep
+    only the volatile ones in raw_headers. The ScanResults are not saved.
+    """
+    splits = [split_headers(headers) for headers in header_dicts]
+    header_sets = intern_header_sets([stable for stable, volatile in splits])
+    for scan_result, header_set, (stable, volatile) in zip(scan_results, header_sets, splits):
+        scan_result.header_set = header_set
+        scan_result.raw_headers = volatile
+
+
+def severity_counts(issues):
+    """high_count, medium_count and low_count for a list of issue dicts"""
+    counts = Counter(issue['severity'] for issue in issues)
+    return {f'{severity}_count': counts[severity] for severity in ('high', 'medium', 'low')}
+
+
+def _build_issue(scan_result, issue):
+    return Issue(
+        scan_result=scan_result,
+        severity=issue['severity'],
+        category=issue['category'],
+        message=issue['message'],
+        recommendation=issue['recommendation']
+    )
@@ -0,0 +1,129 @@
+"""
+Stub HTTP Server
+A local, configurable target site for benchmarks: response headers, cookies,
+redirect chains, body size, latency and a site of linked pages are all set
+by the caller
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_HEADERS = {
+    'Content-Type': 'text/html; charset=utf-8',
+    'Strict-Transport-Security': 'max-age=31536000',
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+}
+
+
+class StubConfig:
+    def __init__(self, headers=None, cookies=(), redirects=0, body_size=16 * 1024, latency=0.0,
+                 pages=0, links_per_page=5):
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.cookies = list(cookies)  # raw Set-Cookie values
+        self.redirects = redirects    # hops before the final page
+        self.body_size = body_size
+        self.latency = latency        # seconds slept before each response
+        self.pages = pages            # size of the linked site under /page/<n>, 0 for none
+        self.links_per_page = links_per_page
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real server
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+
+        # /hop/<n>/... redirects n more times before the final page
+        parts = self.path.split('/')
+        hops = int(parts[2]) if len(parts) > 2 and parts[1] == 'hop' and parts[2].isdigit() else config.redirects
+        if hops > 0:
+            self.send_response(302)
+            self.send_header('Location', f'/hop/{hops - 1}/')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = self._page_body(config)
+        self.send_response(200)
+        for name, value in config.headers.items():
+            self.send_header(name, value)
+        for cookie in config.cookies:
+            self.send_header('Set-Cookie', cookie)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the scanner stops reading after its body cap
+
+    def _page_body(self, config):
+        """
+        With `pages` set, page n links to pages n*k+1 .. n*k+k (k = links_per_page),
+        making a tree every page of which is reachable from /
+        """
+        if not config.pages:
+            return b'x' * config.body_size
+        parts = self.path.split('/')
+        n = int(parts[2]) if len(parts) > 2 and parts[1] == 'page' and parts[2].isdigit() else 0
+        first = n * config.links_per_page + 1
+        links = ''.join(
+            f'<a href="/page/{i}">page {i}</a>\n'
+            for i in range(first, min(first + config.links_per_page, config.pages))
+        )
+        html = f'<html><body><h1>Page {n}</h1>\n{links}<a href="https://elsewhere.example/">out</a>\n'
+        return html.encode('utf-8').ljust(config.body_size, b' ') + b'</body></html>'
+
+
+class StubServer:
+    """
+    Runs the stub on a free local port in a background thread:
+
+        with StubServer(StubConfig(redirects=2)) as server:
+            scan(server.url)
+
+    Pass a server-side `ssl_context` to serve HTTPS instead.
+    """
+
+    def __init__(self, config=None, host='127.0.0.1', port=0, ssl_context=None):
+        handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config or StubConfig()})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.scheme = 'http'
+        if ssl_context is not None:
+            self.httpd.socket = ssl_context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = 'https'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='stub-http', daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'{self.scheme}://{host}:{port}/'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,75 @@
+import asyncio
+import shutil
+import ssl
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from .async_scanner import AsyncSecurityScanner
+from .rules import load_ruleset
+from .scanner import SecurityScanner
+from .stubserver import StubServer
+
+
+class HeaderRuleTests(SimpleTestCase):
+    def failed_rules(self, csp):
+        return {rule.id for rule in load_ruleset().evaluate({'Content-Security-Policy': csp})}
+
+    def test_unsafe_inline_script_is_flagged(self):
+        self.assertIn('csp-unsafe-inline-script', self.failed_rules("script-src 'self' 'unsafe-inline'"))
+        self.assertIn('csp-unsafe-inline-script', self.failed_rules("default-src 'self' 'unsafe-inline'"))
+
+    def test_unsafe_inline_script_ignored_next_to_nonce_hash_or_strict_dynamic(self):
+        # CSP3 browsers ignore 'unsafe-inline' here; it is the fallback for older ones
+        for source in ("'nonce-r4nd0m'", "'sha256-abc='", "'strict-dynamic'"):
+            with self.subTest(source=source):
+                self.assertNotIn(
+                    'csp-unsafe-inline-script',
+                    self.failed_rules(f"script-src 'self' 'unsafe-inline' {source}"),
+                )
+
+
+@skipUnless(shutil.which('openssl'), 'needs openssl to make a certificate')
+class CertificateVerificationTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, directory)
+        cert, key = directory / 'cert.pem', directory / 'key.pem'
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '365', '-subj', '/CN=localhost',
+             '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1', '-keyout', str(key), '-out', str(cert)],
+            check=True, capture_output=True,
+        )
+        cls.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        cls.context.load_cert_chain(cert, key)
+
+    def assert_unverified(self, result):
+        issues = [issue for issue in result['issues'] if 'could not be verified' in issue['message']]
+        self.assertEqual(len(issues), 1)
+        self.assertEqual(issues[0]['severity'], 'high')
+        self.assertEqual(issues[0]['category'], 'TLS')
+        self.assertIn('self-signed', result['tls']['verify_error'])
+
+    def test_self_signed_certificate_is_scored(self):
+        with StubServer(ssl_context=self.context) as server:
+            result = SecurityScanner().scan_url(server.url)
+        self.assert_unverified(result)
+
+        rescored = SecurityScanner().rescore(
+            final_url=result['final_url'], headers=result['headers'], redirects=result['redirects'],
+            cookies=result['cookies'], issues=result['issues'], tls=result['tls'],
+        )
+        self.assertEqual(rescored['score'], result['score'])
+
+    def test_self_signed_certificate_is_scored_async(self):
+        async def scan(url):
+            async with AsyncSecurityScanner() as scanner:
+                return await scanner.scan_url(url)
+
+        with StubServer(ssl_context=self.context) as server:
+            self.assert_unverified(asyncio.run(scan(server.url)))
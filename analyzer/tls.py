@@ -0,0 +1,370 @@
+"""
+TLS Inspection
+Certificate and protocol details of the TLS connections the scanner already
+opens. The handshake is inspected as it completes, so no second connection
+is made, and the result is cached per host:port until the certificate
+expires: hosts scanned again reuse it without parsing the certificate again.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+
+# Object identifiers read from certificates
+RSA_ENCRYPTION = '1.2.840.113549.1.1.1'
+EC_PUBLIC_KEY = '1.2.840.10045.2.1'
+ED25519 = '1.3.101.112'
+ED448 = '1.3.101.113'
+
+EC_CURVE_BITS = {
+    '1.2.840.10045.3.1.1': 192,   # secp192r1
+    '1.3.132.0.33': 224,          # secp224r1
+    '1.2.840.10045.3.1.7': 256,   # prime256v1
+    '1.3.132.0.10': 256,          # secp256k1
+    '1.3.132.0.34': 384,          # secp384r1
+    '1.3.132.0.35': 521,          # secp521r1
+}
+
+SIGNATURE_HASHES = {
+    '1.2.840.113549.1.1.4': 'md5',
+    '1.2.840.113549.1.1.5': 'sha1',
+    '1.2.840.113549.1.1.10': 'rsassa-pss',
+    '1.2.840.113549.1.1.11': 'sha256',
+    '1.2.840.113549.1.1.12': 'sha384',
+    '1.2.840.113549.1.1.13': 'sha512',
+    '1.2.840.10045.4.1': 'sha1',
+    '1.2.840.10045.4.3.2': 'sha256',
+    '1.2.840.10045.4.3.3': 'sha384',
+    '1.2.840.10045.4.3.4': 'sha512',
+    ED25519: 'ed25519',
+    ED448: 'ed448',
+}
+
+WEAK_PROTOCOLS = {'SSLv2', 'SSLv3', 'TLSv1', 'TLSv1.1'}
+WEAK_HASHES = {'md5', 'sha1'}
+# OpenSSL cipher name fragments of broken or anonymous suites
+WEAK_CIPHER_MARKERS = ('NULL', 'EXP', 'RC4', 'DES', 'MD5', 'ADH', 'AECDH', 'anon')
+
+# Cache lifetime of certificates whose expiry could not be read
+DEFAULT_CACHE_TTL = timedelta(days=1)
+
+
+class CertificateParseError(ValueError):
+    pass
+
+
+def _read_tlv(data, offset):
+    """(tag, value, next offset) of the DER element at `offset`"""
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        offset += 2
+        if length & 0x80:
+            size = length & 0x7f
+            length = int.from_bytes(data[offset:offset + size], 'big')
+            offset += size
+    except IndexError:
+        raise CertificateParseError('Truncated DER element')
+    end = offset + length
+    if end > len(data):
+        raise CertificateParseError('Truncated DER element')
+    return tag, data[offset:end], end
+
+
+def _children(data):
+    """The (tag, value) elements inside a DER SEQUENCE or SET value"""
+    items = []
+    offset = 0
+    while offset < len(data):
+        tag, value, offset = _read_tlv(data, offset)
+        items.append((tag, value))
+    return items
+
+
+def _oid(value):
+    first = value[0]
+    parts = [str(first // 40), str(first % 40)] if first < 80 else ['2', str(first - 80)]
+    number = 0
+    for byte in value[1:]:
+        number = (number << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            parts.append(str(number))
+            number = 0
+    return '.'.join(parts)
+
+
+def _time(tag, value):
+    text = value.decode('ascii')
+    # UTCTime has a two-digit year, GeneralizedTime a four-digit one
+    fmt = '%y%m%d%H%M%SZ' if tag == 0x17 else '%Y%m%d%H%M%SZ'
+    return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc)
+
+
+def parse_certificate(der):
+    """
+    Validity period, public key type and size and signature hash of a DER
+    encoded X.509 certificate. Only the fields the checks need are read.
+    Raises CertificateParseError for anything that is not a certificate.
+    """
+    try:
+        (_, certificate), = _children(der)
+        fields = _children(certificate)
+        tbs, signature_algorithm = fields[0][1], fields[1][1]
+        tbs_fields = _children(tbs)
+        if tbs_fields[0][0] == 0xa0:  # explicit version
+            tbs_fields = tbs_fields[1:]
+        validity, public_key_info = tbs_fields[3][1], tbs_fields[5][1]
+
+        not_before, not_after = (_time(tag, value) for tag, value in _children(validity))
+
+        algorithm, public_key = _children(public_key_info)
+        algorithm = _children(algorithm[1])
+        key_oid = _oid(algorithm[0][1])
+        if key_oid == RSA_ENCRYPTION:
+            # BIT STRING: one byte of unused bits, then SEQUENCE {modulus, exponent}
+            (_, rsa_key), = _children(public_key[1][1:])
+            modulus = _children(rsa_key)[0][1]
+            key_type, key_bits = 'RSA', int.from_bytes(modulus, 'big').bit_length()
+        elif key_oid == EC_PUBLIC_KEY:
+            curve = _oid(algorithm[1][1]) if len(algorithm) > 1 and algorithm[1][0] == 0x06 else None
+            key_type, key_bits = 'EC', EC_CURVE_BITS.get(curve)
+        elif key_oid == ED25519:
+            key_type, key_bits = 'Ed25519', 256
+        elif key_oid == ED448:
+            key_type, key_bits = 'Ed448', 448
+        else:
+            key_type, key_bits = key_oid, None
+
+        signature_oid = _oid(_children(signature_algorithm)[0][1])
+    except (IndexError, TypeError, ValueError) as e:
+        if isinstance(e, CertificateParseError):
+            raise
+        raise CertificateParseError(f'Not a DER certificate: {e}')
+
+    return {
+        'not_before': not_before,
+        'not_after': not_after,
+        'key_type': key_type,
+        'key_bits': key_bits,
+        'signature_hash': SIGNATURE_HASHES.get(signature_oid, signature_oid),
+    }
+
+
+def _name_attribute(name, attribute):
+    """First `attribute` (e.g. 'commonName') of a name from SSLSocket.getpeercert()"""
+    for rdn in name or ():
+        for key, value in rdn:
+            if key == attribute:
+                return value
+    return None
+
+
+class TLSInfo:
+    """The negotiated protocol and cipher and the leaf certificate of a TLS connection"""
+
+    __slots__ = ('host', 'port', 'protocol', 'cipher', 'cipher_bits', 'fingerprint', 'subject', 'issuer',
+                 'san', 'not_before', 'not_after', 'key_type', 'key_bits', 'signature_hash', 'verify_error')
+
+    def __init__(self, host, port, protocol=None, cipher=None, cipher_bits=None, fingerprint=None,
+                 subject=None, issuer=None, san=(), not_before=None, not_after=None,
+                 key_type=None, key_bits=None, signature_hash=None, verify_error=None):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.cipher = cipher
+        self.cipher_bits = cipher_bits
+        self.fingerprint = fingerprint  # SHA-256 of the DER certificate
+        self.subject = subject
+        self.issuer = issuer
+        self.san = list(san)
+        self.not_before = not_before
+        self.not_after = not_after
+        self.key_type = key_type
+        self.key_bits = key_bits
+        self.signature_hash = signature_hash
+        self.verify_error = verify_error  # why the chain did not verify, None if it did
+
+    @classmethod
+    def from_ssl_object(cls, ssl_object, host, port, der=None):
+        """
+        Read an established ssl.SSLSocket or ssl.SSLObject. Subject, issuer
+        and names are only available when the certificate was verified.
+        """
+        der = der or ssl_object.getpeercert(binary_form=True)
+        cipher = ssl_object.cipher() or (None, None, None)
+        info = cls(
+            host, port,
+            protocol=ssl_object.version(),
+            cipher=cipher[0],
+            cipher_bits=cipher[2],
+            fingerprint=hashlib.sha256(der).hexdigest() if der else None,
+        )
+        peer = ssl_object.getpeercert() or {}
+        info.subject = _name_attribute(peer.get('subject'), 'commonName')
+        info.issuer = (_name_attribute(peer.get('issuer'), 'organizationName')
+                       or _name_attribute(peer.get('issuer'), 'commonName'))
+        info.san = [value for kind, value in peer.get('subjectAltName', ()) if kind == 'DNS']
+        if der:
+            try:
+                certificate = parse_certificate(der)
+            except CertificateParseError:
+                certificate = {}
+            for name, value in certificate.items():
+                setattr(info, name, value)
+        return info
+
+    @classmethod
+    def from_dict(cls, data):
+        """TLSInfo from a stored to_dict()"""
+        data = dict(data)
+        for name in ('not_before', 'not_after'):
+            if data.get(name):
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            'host': self.host,
+            'port': self.port,
+            'protocol': self.protocol,
+            'cipher': self.cipher,
+            'cipher_bits': self.cipher_bits,
+            'subject': self.subject,
+            'issuer': self.issuer,
+            'san': self.san,
+            'not_before': self.not_before.isoformat() if self.not_before else None,
+            'not_after': self.not_after.isoformat() if self.not_after else None,
+            'key_type': self.key_type,
+            'key_bits': self.key_bits,
+            'signature_hash': self.signature_hash,
+            'fingerprint': self.fingerprint,
+            'verify_error': self.verify_error,
+        }
+
+
+class TLSCache:
+    """
+    TLSInfo per (host, port), kept until the certificate expires (a day if
+    its expiry is unknown). A new handshake presenting the same certificate
+    only refreshes the entry; a renewed certificate replaces it.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, host, port):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[(host, port)]
+                return None
+            self._entries.move_to_end((host, port))
+            return entry[0]
+
+    def put(self, info):
+        expires = info.not_after or datetime.now(timezone.utc) + DEFAULT_CACHE_TTL
+        with self._lock:
+            self._entries[(info.host, info.port)] = (info, expires)
+            self._entries.move_to_end((info.host, info.port))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, ssl_object, host, port):
+        """TLSInfo for an established connection, parsed only if its certificate is new"""
+        der = ssl_object.getpeercert(binary_form=True)
+        if der:
+            fingerprint = hashlib.sha256(der).hexdigest()
+            cached = self.get(host, port)
+            if cached is not None and cached.fingerprint == fingerprint:
+                return cached
+        info = TLSInfo.from_ssl_object(ssl_object, host, port, der)
+        self.put(info)
+        return info
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every scanner in the process
+tls_cache = TLSCache()
+
+
+def tls_for_url(url):
+    """Cached TLSInfo of the host serving an https:// URL, or None"""
+    parts = urlsplit(url)
+    if parts.scheme != 'https' or not parts.hostname:
+        return None
+    try:
+        port = parts.port or 443
+    except ValueError:
+        return None
+    return tls_cache.get(parts.hostname, port)
+
+
+def tls_issues(info, now=None):
+    """
+    Issues found in a TLSInfo, as dicts with severity, category, message,
+    recommendation and the points they cost
+    """
+    now = now or datetime.now(timezone.utc)
+    issues = []
+
+    def add(severity, message, recommendation, points):
+        issues.append({
+            'severity': severity,
+            'category': 'TLS',
+            'message': message,
+            'recommendation': recommendation,
+            'points': points,
+        })
+
+    expired = info.not_after is not None and info.not_after <= now
+    if info.verify_error and not expired:  # an expired certificate is reported below
+        add('high', f'TLS certificate could not be verified ({info.verify_error})',
+            'Serve a certificate for this host name from a trusted CA, with the full intermediate chain; '
+            'browsers refuse connections to sites whose certificate does not verify.', 20)
+
+    if info.not_after is not None:
+        remaining = info.not_after - now
+        if remaining <= timedelta(0):
+            add('high', f'TLS certificate expired on {info.not_after:%Y-%m-%d}',
+                'Renew the certificate now; browsers refuse connections to sites with expired certificates.', 20)
+        elif remaining <= timedelta(days=14):
+            add('high', f'TLS certificate expires in {remaining.days} days',
+                'Renew the certificate, and automate renewal (e.g. with ACME) so it never lapses.', 10)
+        elif remaining <= timedelta(days=30):
+            add('medium', f'TLS certificate expires in {remaining.days} days',
+                'Renew the certificate soon, and automate renewal (e.g. with ACME) so it never lapses.', 5)
+
+    if info.protocol in WEAK_PROTOCOLS:
+        add('high', f'Connection negotiated the outdated {info.protocol} protocol',
+            'Disable SSLv3, TLS 1.0 and TLS 1.1 on the server and offer TLS 1.2 and TLS 1.3 only.', 15)
+
+    if info.cipher and (any(marker in info.cipher for marker in WEAK_CIPHER_MARKERS)
+                        or (info.cipher_bits is not None and info.cipher_bits < 128)):
+        add('high', f'Connection negotiated the weak cipher suite {info.cipher}',
+            'Disable NULL, export, anonymous, RC4, DES and 3DES cipher suites; prefer AES-GCM or ChaCha20-Poly1305.', 10)
+    elif info.cipher and info.protocol == 'TLSv1.2' and not info.cipher.startswith(('ECDHE', 'DHE')):
+        add('low', f'Cipher suite {info.cipher} does not provide forward secrecy',
+            'Prefer ECDHE key exchange so recorded traffic cannot be decrypted if the private key leaks.', 3)
+
+    if info.key_type == 'RSA' and info.key_bits and info.key_bits < 2048:
+        add('high', f'TLS certificate uses a {info.key_bits}-bit RSA key',
+            'Issue the certificate for an RSA key of at least 2048 bits, or an ECDSA P-256 key.', 15)
+    elif info.key_type == 'EC' and info.key_bits and info.key_bits < 256:
+        add('medium', f'TLS certificate uses a {info.key_bits}-bit EC key',
+            'Issue the certificate for a key on the P-256 curve or stronger.', 8)
+
+    if info.signature_hash in WEAK_HASHES:
+        add('high', f'TLS certificate is signed with {info.signature_hash.upper()}',
+            'Reissue the certificate with a SHA-256 (or stronger) signature.', 10)
+
+    return issues
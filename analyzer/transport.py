@@ -0,0 +1,263 @@
+"""
+HTTP Transport
+Long-lived pooled keep-alive sessions with a TTL DNS cache for the scanner
+"""
+import contextlib
+import contextvars
+import socket
+import threading
+import time
+from collections import Counter
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .tls import tls_cache
+
+
+DEFAULT_POOL_CONNECTIONS = 100  # number of hosts with a cached connection pool
+DEFAULT_POOL_MAXSIZE = 4        # keep-alive connections kept per host
+DEFAULT_DNS_TTL = 300           # seconds
+
+# Phase timings (seconds) of the scan running in the current thread or task
+_phase_timings = contextvars.ContextVar('phase_timings', default=None)
+
+
+@contextlib.contextmanager
+def collect_phase_timings():
+    """
+    Collect the connection phases (dns, connect, tls) of the requests made
+    inside the block into the yielded dict. Reused keep-alive connections
+    add nothing.
+    """
+    timings = {}
+    token = _phase_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _phase_timings.reset(token)
+
+
+def record_phase(phase, seconds):
+    """Add `seconds` to `phase` of the scan in progress, if timings are being collected"""
+    timings = _phase_timings.get()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+class DNSCache:
+    """Caches getaddrinfo() lookups for a fixed number of seconds"""
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def resolve(self, host, port):
+        """Return the address to connect to for host"""
+        if not self.ttl or _is_ip_address(host):
+            return host
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        address = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)[0][4][0]
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {h: e for h, e in self._entries.items() if e[1] > now}
+            self._entries[host] = (address, now + self.ttl)
+        return address
+
+    def forget(self, host):
+        with self._lock:
+            self._entries.pop(host, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TransportStats:
+    """Counts requests and newly opened connections per host"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.connections = Counter()
+
+    def record_request(self, host):
+        with self._lock:
+            self.requests[host] += 1
+
+    def record_connection(self, host):
+        with self._lock:
+            self.connections[host] += 1
+
+    def snapshot(self, top=10):
+        with self._lock:
+            requests_total = sum(self.requests.values())
+            connections_total = sum(self.connections.values())
+            busiest = self.requests.most_common(top)
+            per_host = {
+                host: {'requests': count, 'connections': self.connections[host]}
+                for host, count in busiest
+            }
+        reused = max(requests_total - connections_total, 0)
+        return {
+            'requests': requests_total,
+            'connections_opened': connections_total,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / requests_total, 4) if requests_total else 0.0,
+            'per_host': per_host,
+        }
+
+
+def _is_ip_address(host):
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except OSError:
+            pass
+    return False
+
+
+class _CachedDNSConnectionMixin:
+    """
+    Resolves the host through the transport's DNS cache before connecting,
+    records how long the lookup, the TCP connect and the TLS handshake took,
+    and hands each new TLS connection to the TLS cache for inspection
+    """
+
+    transport = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        self.transport.stats.record_connection(host)
+        started = time.perf_counter()
+        try:
+            self._dns_host = self.transport.dns_cache.resolve(host, self.port)
+        except socket.gaierror:
+            return super()._new_conn()  # let urllib3 raise its usual error
+        resolved = time.perf_counter()
+        record_phase('dns', resolved - started)
+
+        try:
+            return super()._new_conn()
+        except Exception:
+            self.transport.dns_cache.forget(host)
+            raise
+        finally:
+            self._dns_host = host
+            self._socket_ready = time.perf_counter()
+            record_phase('connect', self._socket_ready - resolved)
+
+    def connect(self):
+        self._socket_ready = None
+        super().connect()
+        # HTTPSConnection.connect() does the TLS handshake after _new_conn()
+        if self._socket_ready is not None and isinstance(self, HTTPSConnection):
+            record_phase('tls', time.perf_counter() - self._socket_ready)
+            if hasattr(self.sock, 'getpeercert'):
+                tls_cache.record(self.sock, self.host, self.port)
+
+
+class _NoCookiePolicy(DefaultCookiePolicy):
+    """Keeps a shared session from carrying cookies from one scan to the next"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class ScannerAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools use the DNS cache and record stats"""
+
+    def __init__(self, transport, **kwargs):
+        self.transport = transport
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.transport.pool_classes
+
+    def send(self, request, **kwargs):
+        host = requests.utils.urlparse(request.url).hostname or ''
+        self.transport.stats.record_request(host)
+        return super().send(request, **kwargs)
+
+
+class Transport:
+    """
+    Owns one requests.Session shared by every scanner in the process.
+    Connections are kept alive per host and DNS answers are cached for
+    `dns_ttl` seconds, so rescanning a host skips both handshakes and lookups.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 dns_ttl=DEFAULT_DNS_TTL):
+        self.dns_cache = DNSCache(ttl=dns_ttl)
+        self.stats = TransportStats()
+
+        attrs = {'transport': self}
+        http_connection = type('CachedDNSHTTPConnection', (_CachedDNSConnectionMixin, HTTPConnection), attrs)
+        https_connection = type('CachedDNSHTTPSConnection', (_CachedDNSConnectionMixin, HTTPSConnection), attrs)
+        self.pool_classes = {
+            'http': type('ScannerHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+            'https': type('ScannerHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+        }
+
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_NoCookiePolicy())
+        adapter = ScannerAdapter(self, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def snapshot(self):
+        """Connection reuse and DNS cache statistics"""
+        data = self.stats.snapshot()
+        data['dns_cache'] = {'hits': self.dns_cache.hits, 'misses': self.dns_cache.misses}
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+_transport_options = {}
+
+
+def configure(**options):
+    """Set the options used for the shared transport, replacing any existing one"""
+    global _transport
+    with _transport_lock:
+        _transport_options.clear()
+        _transport_options.update(options)
+        if _transport is not None:
+            _transport.close()
+            _transport = None
+
+
+def get_transport():
+    """Return the process-wide Transport, creating it on first use"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport(**_transport_options)
+    return _transport
@@ -4,9 +4,21 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('scan/', views.scan, name='scan'),
+    path('api/scan/', views.scan_api, name='scan_api'),
+    path('batches/', views.batch_create, name='batch_create'),
+    path('batches/<int:batch_id>/', views.batch_status, name='batch_status'),
+    path('crawls/', views.crawl_create, name='crawl_create'),
+    path('crawls/<int:crawl_id>/', views.crawl_status, name='crawl_status'),
     path('result/<int:scan_id>/', views.result, name='result'),
+    path('result/<int:scan_id>/status/', views.result_status, name='result_status'),
+    path('archive/<int:scan_id>/', views.archived_scan, name='archived_scan'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('history/', views.history, name='history'),
     path('my-scans/', views.my_scans, name='my_scans'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('export/scans.<str:export_format>', views.export_scans, name='export_scans'),
+    path('rescore/', views.rescore_create, name='rescore_create'),
+    path('rescore/<int:run_id>/', views.rescore_status, name='rescore_status'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register_view, name='register'),
@@ -1,10 +1,30 @@
+import hmac
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import ScanResult, Issue
-from .scanner import SecurityScanner
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from asgiref.sync import sync_to_async
+from . import metrics
+from .async_scanner import AsyncSecurityScanner
+from .batch import parse_url_list, start_batch, start_crawl
+from .cache import get_scan_cache
+from .export import CONTENT_TYPES, filter_scans, iter_export, parse_when
+from .models import Issue, RescoreRun, ScanBatch, ScanResult, SiteCrawl
+from .pagination import paginate_keyset
+from .rescoring import start_rescore
+from .retention import archived_scan_result, read_archived
+from .rollups import dashboard_data
+from .scanner import normalize_url
+from .services import save_scan_results
+from .worker import enqueue_scan
 
 
 def home(request):
@@ -20,50 +40,273 @@ def scan(request):
             messages.error(request, 'Please enter a valid URL.')
             return render(request, 'analyzer/scan.html')
         
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
+        url = normalize_url(url)
         
-        try:
-            scanner = SecurityScanner()
-            result_data = scanner.scan_url(url)
-            
-            # Save to database
-            scan_result = ScanResult.objects.create(
-                url=url,
-                final_url=result_data['final_url'],
-                status_code=result_data['status_code'],
-                score=result_data['score'],
-                raw_headers=result_data['headers'],
-                owner=request.user if request.user.is_authenticated else None
-            )
-            
-            # Save issues
-            for issue in result_data['issues']:
-                Issue.objects.create(
-                    scan_result=scan_result,
-                    severity=issue['severity'],
-                    category=issue['category'],
-                    message=issue['message'],
-                    recommendation=issue['recommendation']
-                )
-            
-            return redirect('result', scan_id=scan_result.id)
+        # Reuse a recent result of the requester's for the same URL unless a
+        # fresh scan is requested
+        if not request.POST.get('force'):
+            cached = _cached_scan_id(url, _request_owner(request))
+            if cached is not None:
+                return redirect('result', scan_id=cached)
         
-        except Exception as e:
-            messages.error(request, f'Error scanning URL: {str(e)}')
-            return render(request, 'analyzer/scan.html')
+        # The scan itself runs in the background worker (run_scan_worker)
+        scan_result = enqueue_scan(url, owner=_request_owner(request))
+        return redirect('result', scan_id=scan_result.id)
     
     return render(request, 'analyzer/scan.html')
 
 
+def _cached_scan_id(url, owner):
+    """
+    Id of the fresh cached scan of `url` if `owner` owns it. The cache is
+    keyed by URL alone, so a result cached for another user is not shown;
+    their scan still lets the worker make a conditional request.
+    """
+    scan_cache = get_scan_cache()
+    entry = scan_cache.get(url)
+    if entry is None or not entry.is_fresh:
+        return None
+    owners = list(ScanResult.objects.filter(id=entry.scan_id).values_list('owner_id', flat=True))
+    if not owners:
+        scan_cache.invalidate(url)
+        return None
+    if owners[0] != (owner.id if owner is not None else None):
+        return None
+    return entry.scan_id
+
+
+@login_required
+@require_POST
+def batch_create(request):
+    """Start a bulk scan from a newline-separated 'urls' field or an uploaded 'file'"""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        lines = (line.decode('utf-8', 'replace') for line in upload)
+    else:
+        lines = request.POST.get('urls', '').splitlines()
+    urls = parse_url_list(lines)
+
+    if not urls:
+        return JsonResponse({'error': 'No URLs provided.'}, status=400)
+
+    max_urls = getattr(settings, 'SCAN_BATCH_MAX_URLS', 10000)
+    if len(urls) > max_urls:
+        return JsonResponse({'error': f'A batch may contain at most {max_urls} URLs.'}, status=400)
+
+    batch = ScanBatch.objects.create(owner=request.user, total=len(urls))
+    start_batch(
+        batch,
+        urls,
+        max_workers=getattr(settings, 'SCAN_BATCH_WORKERS', 16),
+        per_host=getattr(settings, 'SCAN_BATCH_PER_HOST', 2),
+    )
+    return JsonResponse(_batch_payload(batch), status=202)
+
+
+@login_required
+@require_GET
+def batch_status(request, batch_id):
+    """Progress of a bulk scan"""
+    batch = get_object_or_404(ScanBatch, id=batch_id, owner=request.user)
+    return JsonResponse(_batch_payload(batch))
+
+
+@login_required
+@require_POST
+def crawl_create(request):
+    """Start a multi-page crawl of the site at 'url'"""
+    url = normalize_url(request.POST.get('url', ''))
+    if not url:
+        return JsonResponse({'error': 'Please enter a valid URL.'}, status=400)
+
+    try:
+        max_pages = int(request.POST.get('max_pages') or getattr(settings, 'CRAWL_MAX_PAGES', 100))
+        max_depth = int(request.POST.get('max_depth') or getattr(settings, 'CRAWL_MAX_DEPTH', 3))
+    except ValueError:
+        return JsonResponse({'error': 'max_pages and max_depth must be integers.'}, status=400)
+    page_limit = getattr(settings, 'CRAWL_PAGE_LIMIT', 1000)
+    if not 1 <= max_pages <= page_limit or max_depth < 0:
+        return JsonResponse({'error': f'max_pages must be between 1 and {page_limit}.'}, status=400)
+
+    crawl = SiteCrawl.objects.create(url=url, owner=request.user, max_pages=max_pages, max_depth=max_depth)
+    start_crawl(
+        crawl,
+        concurrency=getattr(settings, 'CRAWL_CONCURRENCY', 8),
+        rate_per_host=getattr(settings, 'CRAWL_RATE_PER_HOST', 50),
+        max_body_bytes=getattr(settings, 'CRAWL_MAX_BODY_BYTES', 512 * 1024),
+    )
+    return JsonResponse(_crawl_payload(crawl), status=202)
+
+
+@login_required
+@require_GET
+def crawl_status(request, crawl_id):
+    """Progress and rolled-up result of a crawl, with its pages"""
+    crawl = get_object_or_404(SiteCrawl, id=crawl_id, owner=request.user)
+    payload = _crawl_payload(crawl)
+    payload['pages'] = list(
+        crawl.pages.order_by('id').values('id', 'url', 'final_url', 'status_code', 'score')
+    )
+    return JsonResponse(payload)
+
+
+async def scan_api(request):
+    """
+    Scan the newline-separated 'urls' field concurrently on the event loop.
+    This is an async view; serve the project through webguard.asgi so it
+    does not occupy a worker thread while waiting on the network.
+    Requires login, like the other scan entry points; login_required does
+    not wrap async views before Django 5.0, so the check is made here.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    owner = await sync_to_async(_request_owner)(request)
+    if owner is None:
+        return JsonResponse({'error': 'Log in to scan URLs.'}, status=401)
+
+    urls = parse_url_list(request.POST.get('urls', '').splitlines())
+    if not urls:
+        return JsonResponse({'error': 'No URLs provided.'}, status=400)
+
+    max_urls = getattr(settings, 'SCAN_ASYNC_MAX_URLS', 500)
+    if len(urls) > max_urls:
+        return JsonResponse({'error': f'At most {max_urls} URLs may be scanned per request.'}, status=400)
+
+    scanned = []
+    errors = []
+    concurrency = getattr(settings, 'SCAN_ASYNC_CONCURRENCY', 200)
+    async with AsyncSecurityScanner(max_concurrency=concurrency) as scanner:
+        async for url, result_data, error in scanner.scan_many(urls):
+            if error:
+                errors.append({'url': url, 'error': error})
+            else:
+                scanned.append((url, result_data))
+
+    # Store every result in one transaction
+    scan_results = await sync_to_async(save_scan_results)(scanned, owner=owner)
+    results = [
+        {'url': scan_result.url, 'scan_id': scan_result.id, 'score': scan_result.score}
+        for scan_result in scan_results
+    ]
+    return JsonResponse({'results': results + errors})
+
+
+@login_required
+@require_POST
+def rescore_create(request):
+    """
+    Staff only: re-score stored scans with the current rules, optionally only
+    those created in [since, until). With dry_run the changes are counted but
+    not written.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Only staff may re-score scans.'}, status=403)
+
+    try:
+        since = parse_when(request.POST['since']) if request.POST.get('since') else None
+        until = parse_when(request.POST['until']) if request.POST.get('until') else None
+    except ValueError:
+        return JsonResponse({'error': 'since and until must be ISO dates.'}, status=400)
+    dry_run = request.POST.get('dry_run', '').lower() in ('1', 'true', 'yes', 'on')
+
+    rescore_run = RescoreRun.objects.create(requested_by=request.user, since=since, until=until, dry_run=dry_run)
+    start_rescore(
+        rescore_run,
+        processes=getattr(settings, 'RESCORE_PROCESSES', None),
+        chunk_size=getattr(settings, 'RESCORE_CHUNK_SIZE', 1000),
+    )
+    return JsonResponse(_rescore_payload(rescore_run), status=202)
+
+
+@login_required
+@require_GET
+def rescore_status(request, run_id):
+    """Progress of a re-scoring run (staff only)"""
+    if not request.user.is_staff:
+        raise Http404('Re-scoring run not found')
+    return JsonResponse(_rescore_payload(get_object_or_404(RescoreRun, id=run_id)))
+
+
+def _request_owner(request):
+    return request.user if request.user.is_authenticated else None
+
+
+def _batch_payload(batch):
+    return {
+        'id': batch.id,
+        'status': batch.status,
+        'total': batch.total,
+        'completed': batch.completed,
+        'failed': batch.failed,
+        'progress': round(batch.progress, 4),
+        'errors': batch.errors,
+        'created_at': batch.created_at.isoformat(),
+        'finished_at': batch.finished_at.isoformat() if batch.finished_at else None,
+    }
+
+
+def _rescore_payload(rescore_run):
+    return {
+        'id': rescore_run.id,
+        'status': rescore_run.status,
+        'dry_run': rescore_run.dry_run,
+        'since': rescore_run.since.isoformat() if rescore_run.since else None,
+        'until': rescore_run.until.isoformat() if rescore_run.until else None,
+        'total': rescore_run.total,
+        'processed': rescore_run.processed,
+        'changed': rescore_run.changed,
+        'error': rescore_run.error,
+        'created_at': rescore_run.created_at.isoformat(),
+        'finished_at': rescore_run.finished_at.isoformat() if rescore_run.finished_at else None,
+    }
+
+
+def _crawl_payload(crawl):
+    return {
+        'id': crawl.id,
+        'url': crawl.url,
+        'status': crawl.status,
+        'max_pages': crawl.max_pages,
+        'max_depth': crawl.max_depth,
+        'pages_scanned': crawl.pages_scanned,
+        'pages_failed': crawl.pages_failed,
+        'score': crawl.score,
+        'average_score': crawl.average_score,
+        'issues': crawl.issues,
+        'errors': crawl.errors,
+        'created_at': crawl.created_at.isoformat(),
+        'finished_at': crawl.finished_at.isoformat() if crawl.finished_at else None,
+    }
+
+
 def result(request, scan_id):
     """Scan results page"""
-    scan_result = get_object_or_404(ScanResult, id=scan_id)
-    issues_by_severity = {
-        'high': scan_result.issues.filter(severity='high'),
-        'medium': scan_result.issues.filter(severity='medium'),
-        'low': scan_result.issues.filter(severity='low'),
-    }
+    # Fetch the issues and their scan in one query, grouping them in memory
+    issues = list(Issue.objects.filter(scan_result_id=scan_id).select_related('scan_result__header_set'))
+    if issues:
+        scan_result = issues[0].scan_result
+    else:
+        scan_result = ScanResult.objects.select_related('header_set').filter(id=scan_id).first()
+        if scan_result is None:
+            return _archived_result(request, scan_id)
+    
+    if scan_result.in_progress:
+        response = render(request, 'analyzer/result.html', {'scan': scan_result, 'in_progress': True})
+        response['Refresh'] = str(getattr(settings, 'SCAN_RESULT_REFRESH_SECONDS', 2))
+        return response
+    
+    issues_by_severity = {'high': [], 'medium': [], 'low': []}
+    if scan_result.is_diff:
+        # Monitoring rescans only store a diff; rebuild the full result
+        headers, issue_dicts = scan_result.materialize()
+        scan_result.raw_headers = headers
+        for issue in issue_dicts:
+            issues_by_severity[issue['severity']].append(issue)
+    else:
+        # Deduplicated header sets are stored apart from the volatile headers
+        scan_result.raw_headers = scan_result.headers
+        for issue in sorted(issues, key=lambda issue: issue.id):
+            issues_by_severity[issue.severity].append(issue)
     
     context = {
         'scan': scan_result,
@@ -72,20 +315,148 @@ def result(request, scan_id):
     return render(request, 'analyzer/result.html', context)
 
 
+def _archived_result(request, scan_id):
+    """Results page of a scan moved to the archive by the retention policy"""
+    record = read_archived(scan_id)
+    if record is None:
+        raise Http404('No scan with this id')
+    scan_result, issues = archived_scan_result(record)
+    issues_by_severity = {'high': [], 'medium': [], 'low': []}
+    for issue in issues:
+        issues_by_severity[issue['severity']].append(issue)
+    return render(request, 'analyzer/result.html', {
+        'scan': scan_result,
+        'issues_by_severity': issues_by_severity,
+        'archived': True,
+    })
+
+
+@login_required
+@require_GET
+def archived_scan(request, scan_id):
+    """
+    A scan moved to the archive by the retention policy, as the JSON it was
+    archived as (with its headers and issues). Only its owner and staff may
+    read it.
+    """
+    record = read_archived(scan_id)
+    if record is None or not (request.user.is_staff or record['owner_id'] == request.user.id):
+        raise Http404('No archived scan with this id')
+    return JsonResponse(record)
+
+
+@require_GET
+def result_status(request, scan_id):
+    """Job state of a scan, for polling while it is queued or running"""
+    scan_result = ScanResult.objects.filter(id=scan_id).first()
+    if scan_result is None:
+        # Moved to the archive by the retention policy
+        record = read_archived(scan_id)
+        if record is None:
+            raise Http404('No scan with this id')
+        scan_result, issues = archived_scan_result(record)
+    return JsonResponse({
+        'id': scan_result.id,
+        'status': scan_result.status,
+        'score': scan_result.score if scan_result.status == 'done' else None,
+        'error': scan_result.error,
+        'failure_reason': scan_result.failure_reason,
+        'timings': scan_result.timings,
+    })
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus metrics of this process and the scan queue"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+
+    queued = dict(
+        ScanResult.objects.filter(status__in=('pending', 'running'))
+        .values('status').annotate(count=Count('id')).values_list('status', 'count')
+    )
+    for status in ('pending', 'running'):
+        metrics.SCAN_JOBS.labels(status).set(queued.get(status, 0))
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 def history(request):
     """Scan history page (requires login)"""
     if not request.user.is_authenticated:
         return render(request, 'analyzer/history.html', {'scans': None})
     
-    scans = ScanResult.objects.all()[:50]  # Last 50 scans
-    return render(request, 'analyzer/history.html', {'scans': scans})
+    page = _scan_page(request, ScanResult.objects.all())
+    return render(request, 'analyzer/history.html', {'scans': page.items, 'page': page})
 
 
 @login_required
 def my_scans(request):
     """User's own scans"""
-    scans = ScanResult.objects.filter(owner=request.user)
-    return render(request, 'analyzer/my_scans.html', {'scans': scans})
+    page = _scan_page(request, ScanResult.objects.filter(owner=request.user))
+    return render(request, 'analyzer/my_scans.html', {'scans': page.items, 'page': page})
+
+
+@login_required
+@require_GET
+def dashboard(request):
+    """
+    Score distribution, daily trend and most common issues over the last
+    ?days= days (default 30), read from the rollup tables. With ?domain=
+    the trend is that of one domain.
+    """
+    try:
+        days = int(request.GET.get('days') or 30)
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer.'}, status=400)
+    max_days = getattr(settings, 'DASHBOARD_MAX_DAYS', 365)
+    if not 1 <= days <= max_days:
+        return JsonResponse({'error': f'days must be between 1 and {max_days}.'}, status=400)
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    domain = request.GET.get('domain', '').strip().lower() or None
+    return JsonResponse(dashboard_data(since, domain=domain))
+
+
+@login_required
+@require_GET
+def export_scans(request, export_format):
+    """
+    Stream the user's scans with their issues as CSV or NDJSON, oldest first.
+    Staff may export every scan with ?scope=all. Optional filters: since and
+    until (ISO dates), after_id (resume after a scan id) and status.
+    """
+    if export_format not in CONTENT_TYPES:
+        raise Http404('Unknown export format')
+
+    queryset = ScanResult.objects.all()
+    if not (request.GET.get('scope') == 'all' and request.user.is_staff):
+        queryset = queryset.filter(owner=request.user)
+
+    try:
+        since = parse_when(request.GET['since']) if request.GET.get('since') else None
+        until = parse_when(request.GET['until']) if request.GET.get('until') else None
+        after_id = int(request.GET['after_id']) if request.GET.get('after_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'since and until must be ISO dates and after_id an integer.'}, status=400)
+    queryset = filter_scans(queryset, since=since, until=until, after_id=after_id, status=request.GET.get('status'))
+
+    response = StreamingHttpResponse(
+        iter_export(queryset, export_format, chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="scans.{export_format}"'
+    return response
+
+
+def _scan_page(request, queryset):
+    """One keyset page of scans, following ?cursor="""
+    queryset = queryset.select_related('owner').defer('raw_headers')
+    return paginate_keyset(
+        queryset,
+        cursor=request.GET.get('cursor'),
+        page_size=getattr(settings, 'SCAN_HISTORY_PAGE_SIZE', 50),
+    )
 
 
 def login_view(request):
@@ -0,0 +1,166 @@
+"""
+Scan Worker
+Database-backed job queue: the scan view enqueues a pending ScanResult and
+a worker process claims and runs it
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from .cache import get_scan_cache
+from .db import BatchedWriter
+from .models import ScanResult
+from .scanner import ScanError, SecurityScanner, record_failure
+from .monitoring import complete_monitored_scan
+from .services import complete_scan_result, fail_scan_result, scan_result_data
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_scan(url, owner=None):
+    """Create a pending ScanResult for the worker to pick up"""
+    return ScanResult.objects.create(url=url, owner=owner, status='pending')
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to running and return it.
+    The conditional UPDATE means two workers can never claim the same job.
+    """
+    candidates = (
+        ScanResult.objects.filter(status='pending')
+        .order_by('id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = ScanResult.objects.filter(id=job_id, status='pending').update(
+            status='running',
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return ScanResult.objects.get(id=job_id)
+    return None
+
+
+def _write_now(func, *args):
+    return func(*args)
+
+
+def run_job(job, writer=None):
+    """
+    Scan the URL of a claimed job and store the outcome, through `writer`
+    (a BatchedWriter) if given.
+    If an earlier result for the URL is cached with an ETag or Last-Modified
+    validator, the fetch is conditional and a 304 reuses that result.
+    Jobs for a MonitoredTarget are stored as a diff against its last scan.
+    """
+    write = writer.call if writer is not None else _write_now
+    entry = get_scan_cache().get(job.url)
+    previous = None
+    if entry is not None and entry.can_revalidate:
+        previous = ScanResult.objects.filter(id=entry.scan_id, status='done').first()
+
+    try:
+        if previous is not None:
+            result_data = SecurityScanner().scan_url(job.url, etag=entry.etag, last_modified=entry.last_modified)
+        else:
+            result_data = SecurityScanner().scan_url(job.url)
+    except ScanError as e:
+        return write(fail_scan_result, job, str(e), e.reason)
+    except Exception as e:
+        record_failure('internal')
+        return write(fail_scan_result, job, str(e), 'internal')
+
+    if result_data.get('not_modified'):
+        fetched = result_data
+        result_data = scan_result_data(previous)
+        result_data['redirects'] = fetched['redirects']
+        result_data['tls'] = fetched['tls'] or result_data['tls']
+        result_data['timings'] = fetched['timings']
+
+    if job.target_id:
+        return write(complete_monitored_scan, job, result_data)
+    return write(complete_scan_result, job, result_data)
+
+
+def requeue_stale_jobs(older_than):
+    """Return jobs stuck in running (e.g. after a worker crash) to the queue"""
+    cutoff = timezone.now() - older_than
+    return ScanResult.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='pending',
+        started_at=None,
+    )
+
+
+class ScanWorker:
+    """
+    Polls the queue from one or more threads until stopped. With a
+    `write_batch_size` above 1 the threads store their results through one
+    BatchedWriter instead of each writing on its own connection.
+    """
+
+    def __init__(self, concurrency=4, poll_interval=1.0, stale_after=timedelta(minutes=5), write_batch_size=1):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.write_batch_size = write_batch_size
+        self.writer = None
+        self.stop_event = threading.Event()
+
+    def _loop(self, exit_when_idle):
+        try:
+            while not self.stop_event.is_set():
+                job = claim_next_job()
+                if job is None:
+                    if exit_when_idle:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                try:
+                    run_job(job, self.writer)
+                except Exception as e:
+                    # e.g. the result could not be stored; the thread goes on with the next job
+                    logger.exception('Scan job %s failed', job.id)
+                    self._fail(job, e)
+        finally:
+            connections.close_all()
+
+    def _fail(self, job, error):
+        record_failure('internal')
+        try:
+            fail_scan_result(job, str(error), 'internal')
+        except Exception:
+            # Left running; requeue_stale_jobs() returns it to the queue
+            logger.exception('Could not mark scan job %s as failed', job.id)
+
+    def run(self, exit_when_idle=False):
+        """Process jobs until stop() is called, or until the queue is empty"""
+        requeue_stale_jobs(self.stale_after)
+        if self.write_batch_size > 1:
+            self.writer = BatchedWriter(batch_size=self.write_batch_size).start()
+
+        threads = [
+            threading.Thread(target=self._loop, args=(exit_when_idle,), name=f'scan-worker-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            if self.writer is not None:
+                self.writer.stop()
+                self.writer = None
+
+    def stop(self):
+        self.stop_event.set()
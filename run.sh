@@ -13,10 +13,17 @@ npm run dev &
 TAILWIND_PID=$!
 cd ../..
 
+# Start the background scan worker and monitoring scheduler
+echo "⚙️  Starting scan worker and monitor..."
+python manage.py run_scan_worker &
+WORKER_PID=$!
+python manage.py run_monitor &
+MONITOR_PID=$!
+
 # Start Django server
 echo "🚀 Starting Django server..."
 python manage.py runserver
 
-# Cleanup: kill Tailwind watcher when Django stops
-kill $TAILWIND_PID
+# Cleanup: kill Tailwind watcher and background processes when Django stops
+kill $TAILWIND_PID $WORKER_PID $MONITOR_PID
 
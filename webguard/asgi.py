@@ -3,6 +3,11 @@ ASGI config for webguard project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Async views such as ``analyzer.views.scan_api`` run directly on the event loop
+when the project is served through this module, e.g.:
+
+    uvicorn webguard.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -84,12 +84,64 @@ WSGI_APPLICATION = 'webguard.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default (tuned by SQLITE_PRAGMAS below). WEBGUARD_DB=postgres
+# switches to PostgreSQL configured from POSTGRES_DB, POSTGRES_USER,
+# POSTGRES_PASSWORD, POSTGRES_HOST and POSTGRES_PORT (needs psycopg).
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. Behind PgBouncer in transaction pooling mode set PGBOUNCER=1, which
+# turns off the server-side cursors the streaming exports use.
+
+DB_PROFILE = os.environ.get('WEBGUARD_DB', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'webguard'),
+            'USER': os.environ.get('POSTGRES_USER', 'webguard'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('PGBOUNCER') == '1',
+            'OPTIONS': {'connect_timeout': 5},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        }
     }
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The 'scans' cache is shared by the web and worker processes: Redis when
+# REDIS_URL is set, otherwise files on this host. The file cache lists its
+# whole directory on every write to decide what to cull, so it is kept small.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
 }
+if os.environ.get('REDIS_URL'):
+    CACHES['scans'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'KEY_PREFIX': 'webguard',
+    }
+else:
+    CACHES['scans'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'scans',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    }
 
 
 # Password validation
@@ -146,3 +198,118 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
+
+# Bulk scanning
+SCAN_BATCH_MAX_URLS = 10000
+SCAN_BATCH_WORKERS = 16
+SCAN_BATCH_PER_HOST = 2
+
+# Async scanning (analyzer.views.scan_api, served through webguard.asgi)
+SCAN_ASYNC_MAX_URLS = 500
+SCAN_ASYNC_CONCURRENCY = 200
+
+# Background scan worker (python manage.py run_scan_worker)
+SCAN_WORKER_CONCURRENCY = 4
+SCAN_RESULT_REFRESH_SECONDS = 2
+
+# Scanner HTTP transport (analyzer.transport)
+SCANNER_POOL_CONNECTIONS = 100  # hosts with a cached keep-alive pool
+SCANNER_POOL_MAXSIZE = 4        # keep-alive connections per host
+SCANNER_DNS_TTL = 300           # seconds to cache DNS answers, 0 disables
+
+# Scanner fetch strategy: 'head' tries HEAD first and falls back to a streamed
+# GET; 'get' always uses a streamed GET. Bodies are cut off after this many bytes.
+SCANNER_FETCH_MODE = 'head'
+SCANNER_MAX_BODY_BYTES = 64 * 1024
+
+# Scan result cache (analyzer.cache): repeated scans of a URL within the TTL
+# reuse the stored result; older entries are revalidated with ETag/Last-Modified
+SCAN_CACHE_ALIAS = 'scans'
+SCAN_CACHE_TTL = 3600                   # seconds a result is reused without a request
+SCAN_CACHE_STALE_TTL = 7 * 24 * 3600    # seconds an entry is kept for revalidation
+SCAN_CACHE_MAX_ENTRIES = 1024           # in-process LRU size
+
+# Header rule file (JSON or YAML) used instead of analyzer/header_rules.json
+SCANNER_HEADER_RULES = None
+
+# Scans per page on the history and my-scans pages
+SCAN_HISTORY_PAGE_SIZE = 50
+
+# Continuous monitoring (python manage.py run_monitor)
+MONITOR_MAX_PER_TICK = 100    # scans enqueued per scheduling round
+MONITOR_SNAPSHOT_EVERY = 20   # store a full snapshot after this many diffs
+
+# Header values at least this long are zlib-compressed inside stored header sets
+HEADER_SET_COMPRESS_MIN_BYTES = 512
+
+# Prometheus metrics: /metrics requires "Authorization: Bearer <token>" when a
+# token is set; scan workers serve their own metrics, with the same token, on
+# the given port of the given address (only local connections by default)
+METRICS_TOKEN = None
+SCAN_WORKER_METRICS_PORT = None
+SCAN_WORKER_METRICS_ADDR = '127.0.0.1'
+
+# Site crawls (analyzer.crawler)
+CRAWL_MAX_PAGES = 100                 # default pages per crawl
+CRAWL_MAX_DEPTH = 3                   # default link depth from the start URL
+CRAWL_PAGE_LIMIT = 1000               # most pages a crawl may request
+CRAWL_CONCURRENCY = 8                 # pages in flight per crawl
+CRAWL_RATE_PER_HOST = 50              # requests per second per host, 0 for no limit
+CRAWL_MAX_BODY_BYTES = 512 * 1024     # HTML read per page when looking for links
+
+# Scan executor for scan_batch: 'thread' scans on SCAN_BATCH_WORKERS threads,
+# 'process' on SCAN_PROCESSES worker processes (default: one per core), each
+# running SCAN_CONCURRENCY_PER_PROCESS scans at once on its own event loop
+SCAN_EXECUTOR = 'thread'
+SCAN_PROCESSES = None
+SCAN_CONCURRENCY_PER_PROCESS = 50
+
+# Redirects are followed hop by hop and every hop is checked. Responses of
+# redirect targets (e.g. a shared SSO login page) are reused for this many
+# seconds across scans; 0 disables the cache.
+SCANNER_MAX_REDIRECTS = 10
+SCANNER_REDIRECT_CACHE_TTL = 300
+SCANNER_REDIRECT_CACHE_MAX_ENTRIES = 1024
+
+# Certificate and protocol details of each host:port, kept until the
+# certificate expires so rescans do not parse it again
+SCANNER_TLS_CACHE_MAX_ENTRIES = 10000
+
+# Scans read per database round trip by the streaming CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Longest window, in days, the rollup-backed dashboard may cover
+DASHBOARD_MAX_DAYS = 365
+
+# Offline re-scoring of stored scans (rescore_scans, /rescore/): worker
+# processes (default: one per core) and scans read and written per chunk
+RESCORE_PROCESSES = None
+RESCORE_CHUNK_SIZE = 1000
+
+# Applied to every new SQLite connection: WAL lets readers carry on during a
+# write, NORMAL only syncs at checkpoints, and a connection finding the
+# database locked waits up to busy_timeout milliseconds instead of failing
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+# Transactions take the write lock as they begin, so those that read before
+# writing wait for other writers instead of failing with "database is locked"
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
+# Scan workers store results through one writer thread, up to this many per
+# transaction; 1 has each worker thread write its own results. SQLite has a
+# single write lock, so batching pays off there; PostgreSQL takes concurrent
+# writes as they come.
+SCAN_WRITE_BATCH_SIZE = 50 if DB_PROFILE == 'sqlite' else 1
+
+# Retention (prune_scans): finished scans past these limits are moved, with
+# their issues, to gzip NDJSON files under SCAN_ARCHIVE_DIR (one per month)
+# and stay readable by id. An owner's RetentionPolicy replaces the per-owner
+# defaults; None means no limit.
+RETENTION_MAX_AGE_DAYS = None           # age limit of every owner's scans
+RETENTION_MAX_SCANS_PER_OWNER = None    # newest scans kept per owner
+RETENTION_MAX_SCANS = None              # newest scans kept overall
+RETENTION_BATCH_SIZE = 500              # scans archived per file write and transaction
+SCAN_ARCHIVE_DIR = BASE_DIR / 'archive'